@@ -0,0 +1,273 @@
+"""Exact depth-first search for the schedule model on integer bitsets.
+
+Every student's allowed slots and current slots are Python ints with one bit per slot, and every
+slot's eligible and assigned students are ints with one bit per student, so the feasibility
+checks are a few bitwise operations and popcounts instead of a PuLP model and a CBC process.
+
+The search fills one slot per level. After every choice it propagates to a fixpoint:
+
+    slot saturation  a slot with 2 students is closed, and one with exactly as many candidates
+                     as open seats takes all of them
+    student caps     a student with 3 slots stops being a candidate anywhere
+    forced slots     a student who needs k more slots and has exactly k open allowed slots
+                     takes all of them; fewer than k is a dead end
+    seat count       the open seats must fit between what students still need and can take
+
+then branches on the open slot with the fewest ways to fill it (in CONTIGUOUS mode, preferring
+slots next to ones already filled). In CONTIGUOUS mode it keeps going after the first schedule,
+pruning every node whose optimistic contiguity cannot beat the incumbent. That bound is loose on
+survey-sized instances, so there the search is mostly an anytime heuristic under time_limit;
+without contiguity it proves feasibility or infeasibility outright.
+"""
+from dataclasses import dataclass
+from itertools import combinations
+import time
+import numpy as np
+from config import MIN_SLOTS_PER_STUDENT, MAX_SLOTS_PER_STUDENT, STUDENTS_PER_SLOT
+
+
+@dataclass
+class BitsetResult:
+    assignment: object  # students x slots bool matrix, or None if no schedule was found
+    score: float  # contiguity of `assignment` (-inf when there is none)
+    nodes: int
+    optimal: bool  # the search finished, so `assignment` is optimal or the instance is infeasible
+    infeasible: bool = False
+
+
+def _bits(row):
+    return sum(1 << int(j) for j in np.flatnonzero(row))
+
+
+def _pairs(a):
+    return (a & (a >> 1)).bit_count()
+
+
+def _best_pairs(a, free, load):
+    """Most back-to-back pairs a student holding slots `a` can end with, adding slots from `free`."""
+    if load >= MAX_SLOTS_PER_STUDENT:
+        return _pairs(a)
+    p = a | free
+    runs = p & (p >> 1) & (p >> 2)
+    while runs:
+        k = (runs & -runs).bit_length() - 1
+        if a & ~(0b111 << k) == 0:
+            return 2
+        runs &= runs - 1
+    if load == MAX_SLOTS_PER_STUDENT - 1:
+        return 1 if _pairs(a) or free & ((a << 1) | (a >> 1)) else 0
+    return 1 if p & (p >> 1) else 0
+
+
+def _min_blocks(a, free, load):
+    """Fewest separate runs of slots a student holding `a` can end with, adding slots from `free`."""
+    if load >= MAX_SLOTS_PER_STUDENT:
+        return load - _pairs(a)
+    p = a | free
+    for width, mask in ((3, 0b111), (2, 0b11)):
+        if load > width:
+            continue
+        runs = p & (p >> 1) & (p >> 2) if width == 3 else p & (p >> 1)
+        while runs:
+            k = (runs & -runs).bit_length() - 1
+            if a & ~(mask << k) == 0:
+                return 1
+            runs &= runs - 1
+    return 2
+
+
+class _State:
+    __slots__ = ("held", "load", "members", "need", "open", "full")
+
+    def copy(self):
+        s = _State()
+        s.held, s.load, s.members, s.need = self.held[:], self.load[:], self.members[:], self.need[:]
+        s.open, s.full = self.open, self.full
+        return s
+
+    def assign(self, i, t):
+        self.held[i] |= 1 << t
+        self.load[i] += 1
+        self.members[t] |= 1 << i
+        self.need[t] -= 1
+        if self.need[t] == 0:
+            self.open &= ~(1 << t)
+        if self.load[i] == MAX_SLOTS_PER_STUDENT:
+            self.full |= 1 << i
+
+
+class BitsetSearch:
+    def __init__(self, must, unavailable, contiguous=True, time_limit=None, node_limit=None, progress=None):
+        must = np.asarray(must, dtype=bool)
+        unavailable = np.asarray(unavailable, dtype=bool)
+        self.shape = must.shape
+        n_students, n_slots = self.shape
+        self.allowed = [_bits(~row) for row in unavailable]
+        self.eligible = [_bits(~col) for col in unavailable.T]
+        self.must = must
+        self.all_slots = (1 << n_slots) - 1
+        self.contiguous = contiguous
+        self.deadline = None if time_limit is None else time.perf_counter() + time_limit
+        self.node_limit = node_limit
+        self.progress = progress
+        self.nodes = 0
+        self.best, self.best_score = None, -1
+        self.stopped = False
+
+    def _root(self):
+        n_students, n_slots = self.shape
+        s = _State()
+        s.held, s.load = [0] * n_students, [0] * n_students
+        s.members, s.need = [0] * n_slots, [STUDENTS_PER_SLOT] * n_slots
+        s.open, s.full = self.all_slots, 0
+        for i, t in zip(*np.nonzero(self.must)):
+            i, t = int(i), int(t)
+            if not self.allowed[i] >> t & 1 or not s.open >> t & 1 or s.full >> i & 1:
+                return None
+            s.assign(i, t)
+        return s
+
+    def _candidates(self, s, t):
+        return self.eligible[t] & ~s.full & ~s.members[t]
+
+    def _propagate(self, s):
+        """Apply the forcing rules until nothing changes; returns the branching slot, -1 if none, or None."""
+        n_students = self.shape[0]
+        while True:
+            changed = False
+            best_t, best_ways = -1, None
+            open_ = s.open
+            while open_:
+                t = (open_ & -open_).bit_length() - 1
+                open_ &= open_ - 1
+                if not s.open >> t & 1:
+                    continue
+                cand = self._candidates(s, t)
+                c = cand.bit_count()
+                if c < s.need[t]:
+                    return None
+                if c == s.need[t]:
+                    while cand:
+                        i = (cand & -cand).bit_length() - 1
+                        cand &= cand - 1
+                        s.assign(i, t)
+                    changed = True
+                    continue
+                ways = c if s.need[t] == 1 else c * (c - 1) // 2
+                if self.contiguous:
+                    # grow blocks outwards from the slots already filled
+                    closed = self.all_slots & ~s.open
+                    ways = (not (closed >> (t + 1) & 1 or (t > 0 and closed >> (t - 1) & 1)), ways)
+                if best_ways is None or ways < best_ways:
+                    best_t, best_ways = t, ways
+
+            required = 0
+            spare = 0
+            for i in range(n_students):
+                short = MIN_SLOTS_PER_STUDENT - s.load[i]
+                spare += MAX_SLOTS_PER_STUDENT - s.load[i]
+                if short <= 0:
+                    continue
+                required += short
+                free = self.allowed[i] & s.open & ~s.held[i]
+                n_free = free.bit_count()
+                if n_free < short:
+                    return None
+                if n_free == short:
+                    while free:
+                        t = (free & -free).bit_length() - 1
+                        free &= free - 1
+                        s.assign(i, t)
+                    required -= short
+                    spare -= short
+                    changed = True
+            seats = sum(s.need)
+            if not required <= seats <= spare:
+                return None
+            if not changed:
+                return best_t
+
+    def _bound(self, s):
+        """Optimistic contiguity: every student's best completion, and all 2 * slots seats minus
+        the fewest runs each student can end with, whichever is smaller."""
+        best, blocks = 0, 0
+        for i in range(self.shape[0]):
+            free = self.allowed[i] & s.open & ~s.held[i]
+            best += _best_pairs(s.held[i], free, s.load[i])
+            blocks += _min_blocks(s.held[i], free, s.load[i])
+        return min(best, STUDENTS_PER_SLOT * self.shape[1] - blocks)
+
+    def _order(self, s, t):
+        """Candidates for slot t, best first.
+
+        In CONTIGUOUS mode students extending one of their blocks come first, then students who
+        could extend t further. Then students still short of 2 slots, those with fewest options first.
+        """
+        cand = self._candidates(s, t)
+        near = (1 << (t + 1)) | (1 << t >> 1)
+        keyed = []
+        while cand:
+            i = (cand & -cand).bit_length() - 1
+            cand &= cand - 1
+            options = (self.allowed[i] & s.open & ~s.held[i]).bit_count()
+            adjacent = extendable = 0
+            if self.contiguous:
+                adjacent = (s.held[i] & near).bit_count()
+                extendable = (self.allowed[i] & s.open & ~s.held[i] & near).bit_count()
+            keyed.append((-adjacent, -extendable, s.load[i] >= MIN_SLOTS_PER_STUDENT, options, i))
+        keyed.sort()
+        return [i for *_, i in keyed]
+
+    def _out_of_budget(self):
+        if self.node_limit is not None and self.nodes >= self.node_limit:
+            return True
+        return self.deadline is not None and self.nodes % 256 == 0 and time.perf_counter() > self.deadline
+
+    def _search(self, s):
+        self.nodes += 1
+        if self._out_of_budget():
+            self.stopped = True
+            return
+        t = self._propagate(s)
+        if t is None:
+            return
+        if t == -1:
+            if s.open:
+                return
+            score = sum(_pairs(h) for h in s.held) if self.contiguous else 0
+            if score > self.best_score:
+                self.best, self.best_score = s.held[:], score
+                if self.progress is not None:
+                    self.progress(self.nodes, score)
+            return
+        if self.contiguous and self.best is not None and self._bound(s) <= self.best_score:
+            return
+
+        order = self._order(s, t)
+        for group in (combinations(order, 2) if s.need[t] == 2 else ((i,) for i in order)):
+            child = s.copy()
+            for i in group:
+                child.assign(i, t)
+            self._search(child)
+            if self.stopped or (self.best is not None and not self.contiguous):
+                return
+
+    def run(self):
+        root = self._root()
+        if root is not None:
+            self._search(root)
+        n_students, n_slots = self.shape
+        if self.best is None:
+            return BitsetResult(None, -np.inf, self.nodes, not self.stopped, infeasible=not self.stopped)
+        assignment = np.array([[h >> t & 1 for t in range(n_slots)] for h in self.best], dtype=bool)
+        return BitsetResult(assignment, float(self.best_score), self.nodes, not self.stopped)
+
+
+def solve_bitset(must, unavailable, contiguous=True, time_limit=60, node_limit=None, progress=None):
+    """Depth-first search with propagation; branch-and-bound on contiguity when `contiguous`.
+
+    Stops at the first schedule when not contiguous. time_limit (seconds) and node_limit cap the
+    search; if either is hit the best schedule so far is returned with optimal=False. If given,
+    progress(nodes, score) is called for every new best schedule.
+    """
+    return BitsetSearch(must, unavailable, contiguous, time_limit, node_limit, progress).run()
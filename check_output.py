@@ -1,5 +1,6 @@
 ## python check_output.py responses.csv schedule_by_student.csv schedule_by_slot.csv
 import sys
+import numpy as np
 import pandas as pd
 import os
 import math
@@ -13,13 +14,7 @@ def clean_slot_list(values):
             result.append(str(v).strip())
     return result
 
-def main():
-    prefs_path = os.path.join(os.getcwd(), sys.argv[1])
-    student_sched_path = os.path.join(os.getcwd(), sys.argv[2])
-    slot_sched_path = os.path.join(os.getcwd(), sys.argv[3])
-    prefs_df = pd.read_csv(prefs_path)
-    student_df = pd.read_csv(student_sched_path)
-    slot_df = pd.read_csv(slot_sched_path)
+def check_files(prefs_df, student_df, slot_df):
     slot_columns = prefs_df.columns[8:].tolist()
     prefs_by_email = {}
     for _, row in prefs_df.iterrows():
@@ -52,6 +47,24 @@ def main():
         students_in_slot = clean_slot_list([row["student 1"], row["student 2"]])
         if len(students_in_slot) != len(set(students_in_slot)):
             slot_unique_student_violations.append(slot_name)
+    return student_slot_uniq_violations, must_have_violations, unavailable_violations, slot_unique_student_violations
+
+def check_matrix(prefs_df, matrix):
+    """Same checks against an in-memory students x slots assignment matrix.
+
+    Row i of the matrix is the student in row i of prefs_df, as built by schedule.py. A boolean
+    matrix cannot hold duplicates, so only the MUST-HAVE and UNAVAILABLE checks can fail.
+    """
+    slot_columns = prefs_df.columns[8:].tolist()
+    emails = prefs_df["Email"].astype(str).str.strip().to_numpy()
+    prefs = np.char.upper(np.char.strip(prefs_df[slot_columns].fillna("").to_numpy(dtype=str)))
+    must_rows, must_cols = np.nonzero((np.char.find(prefs, "MUST-HAVE") >= 0) & ~matrix)
+    unavailable_rows, unavailable_cols = np.nonzero((np.char.find(prefs, "UNAVAILABLE") >= 0) & matrix)
+    must_have_violations = [(emails[i], slot_columns[j]) for i, j in zip(must_rows, must_cols)]
+    unavailable_violations = [(emails[i], slot_columns[j]) for i, j in zip(unavailable_rows, unavailable_cols)]
+    return [], must_have_violations, unavailable_violations, []
+
+def report(student_slot_uniq_violations, must_have_violations, unavailable_violations, slot_unique_student_violations):
     print("Student schedule checks")
     if student_slot_uniq_violations:
         print("Students with non-unique slots:")
@@ -79,5 +92,14 @@ def main():
     else:
         print("All slots have unique students.")
 
+def main():
+    prefs_path = os.path.join(os.getcwd(), sys.argv[1])
+    student_sched_path = os.path.join(os.getcwd(), sys.argv[2])
+    slot_sched_path = os.path.join(os.getcwd(), sys.argv[3])
+    prefs_df = pd.read_csv(prefs_path)
+    student_df = pd.read_csv(student_sched_path)
+    slot_df = pd.read_csv(slot_sched_path)
+    report(*check_files(prefs_df, student_df, slot_df))
+
 if __name__ == "__main__":
     main()
@@ -1 +1,6 @@
-SCHEDULE_MODE = "CONTIGUOUS" 
\ No newline at end of file
+SCHEDULE_MODE = "CONTIGUOUS" 
+
+# the schedule model shared by every backend: each student gets 2-3 slots, each slot exactly 2 students
+MIN_SLOTS_PER_STUDENT = 2
+MAX_SLOTS_PER_STUDENT = 3
+STUDENTS_PER_SLOT = 2
@@ -0,0 +1,257 @@
+"""Adaptively locate the feasibility phase transition for generated labop datasets.
+
+python feasibility_sweep.py --param u --lo 0 --hi 50 --r 20 --m 50 --l 67 --out sweep_data
+
+    --param = which generator parameter to sweep ('r' or 'u'); the other one is held fixed
+    --lo/--hi = inclusive search range for the swept parameter
+    --seed = first seed; the k-th instance at a grid point uses seed+k (same as --num-sets)
+    --batch = seeds added per round at a grid point
+    --min-seeds = seeds solved at a grid point before its side of the boundary is trusted
+    --max-seeds = cap on seeds solved at a single grid point
+    --ci-width = target half-width of the confidence interval on the feasible fraction
+    --confidence = confidence level of the Wilson interval
+
+Instead of solving --num-sets seeds at every (r, u, m, l) folder, this bisects on the swept
+parameter for the point where the feasible fraction crosses 50%. At each probed value seeds are
+added in batches only until the Wilson interval for the feasible fraction excludes 0.5 (so the
+bisection can pick a side) or is tighter than --ci-width. The probes that bracket the boundary are
+then refined to --ci-width so the shape of the transition is resolved where it matters.
+
+Feasibility increases as r and u decrease, so the search assumes the fraction is non-increasing in
+the swept parameter. Every solve is appended to --log in the results.log format, so the output can
+be fed to plot_results.py as well as to the curve CSV written by this script.
+"""
+
+
+from __future__ import annotations
+
+import argparse
+import csv
+import math
+import os
+from statistics import NormalDist
+from typing import Dict, List, Tuple
+
+from labop_distribution import generate_dataset
+from labop_optimizer_sifat import load_instance, template_for
+
+
+def wilson_interval(feasible: int, total: int, confidence: float = 0.95) -> Tuple[float, float]:
+    """Wilson score interval for a binomial proportion. Returns (0, 1) when total == 0."""
+    if total == 0:
+        return 0.0, 1.0
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    p = feasible / total
+    denom = 1 + z * z / total
+    centre = (p + z * z / (2 * total)) / denom
+    half = z * math.sqrt(p * (1 - p) / total + z * z / (4 * total * total)) / denom
+    return max(0.0, centre - half), min(1.0, centre + half)
+
+
+def is_feasible(csv_path: str) -> bool:
+    """Solve the feasibility model from labop_optimizer_sifat.py for one generated CSV."""
+    students, slots, preferences = load_instance(csv_path)
+    status, _ = template_for(len(students), len(slots)).solve(students, slots, preferences)
+    return status == 'Optimal'
+
+
+class PhaseSweep:
+    """Bookkeeping for the adaptive sweep: one (feasible, total) counter per probed value."""
+
+    def __init__(self, param: str, fixed: Dict[str, int], out_dir: str, seed: int, batch: int,
+                 min_seeds: int, max_seeds: int, ci_width: float, confidence: float, log_path: str | None = None):
+        if param not in ("r", "u"):
+            raise ValueError("param must be 'r' or 'u'")
+        if batch < 1:
+            raise ValueError("batch must be at least 1")
+        if min_seeds > max_seeds:
+            raise ValueError("min_seeds must not exceed max_seeds")
+        self.param = param
+        self.fixed = fixed
+        self.out_dir = out_dir
+        self.seed = seed
+        self.batch = batch
+        self.min_seeds = min_seeds
+        self.max_seeds = max_seeds
+        self.ci_width = ci_width
+        self.confidence = confidence
+        self.log_path = log_path
+        self.counts: Dict[int, List[int]] = {}
+        self.solves = 0
+
+    def _params(self, value: int) -> Dict[str, int]:
+        params = dict(self.fixed)
+        params[self.param] = value
+        return params
+
+    def _solve_seed(self, value: int, seed: int) -> bool:
+        p = self._params(value)
+        folder = generate_dataset(l=p["l"], m=p["m"], r=p["r"], total_musts=p["u"], out_dir=self.out_dir, seed=seed)
+        csv_path = os.path.join(folder, f"combined_s{seed}.csv")
+        feasible = is_feasible(csv_path)
+        self.solves += 1
+        if self.log_path:
+            with open(self.log_path, "a") as f:
+                f.write(f"{csv_path},{'Optimal' if feasible else 'Infeasible'}\n")
+        return feasible
+
+    def add_seeds(self, value: int, n: int) -> int:
+        """Solve up to n more seeds at value (never past max_seeds); returns how many were added."""
+        counts = self.counts.setdefault(value, [0, 0])
+        n = max(0, min(n, self.max_seeds - counts[1]))
+        for _ in range(n):
+            counts[0] += int(self._solve_seed(value, self.seed + counts[1]))
+            counts[1] += 1
+        return n
+
+    def interval(self, value: int) -> Tuple[float, float]:
+        feasible, total = self.counts.get(value, (0, 0))
+        return wilson_interval(feasible, total, self.confidence)
+
+    def exhausted(self, value: int) -> bool:
+        return self.counts.get(value, (0, 0))[1] >= self.max_seeds
+
+    def tight(self, value: int) -> bool:
+        lo, hi = self.interval(value)
+        return (hi - lo) / 2 <= self.ci_width
+
+    def side(self, value: int) -> int:
+        """+1 if the value is above 50% feasible, -1 if below, 0 if it sits exactly on 0.5.
+
+        Seeds are added in batches (at least min_seeds) until the interval excludes 0.5, it is
+        already tight, or the seed cap is reached; in the last two cases the point estimate picks
+        the side.
+        """
+        while True:
+            if self.counts.get(value, (0, 0))[1] < self.min_seeds and self.add_seeds(value, self.batch):
+                continue
+            lo, hi = self.interval(value)
+            if lo > 0.5:
+                return 1
+            if hi < 0.5:
+                return -1
+            if self.tight(value) or self.exhausted(value) or not self.add_seeds(value, self.batch):
+                feasible, total = self.counts.get(value, (0, 0))
+                return (2 * feasible > total) - (2 * feasible < total)
+
+    def refine(self, value: int) -> None:
+        while not self.tight(value) and not self.exhausted(value):
+            if not self.add_seeds(value, self.batch):
+                return
+
+    def run(self, lo: int, hi: int) -> float:
+        """Bisect [lo, hi] for the 50% crossing and return the interpolated boundary value."""
+        lo_side = self.side(lo)
+        hi_side = self.side(hi)
+        if lo_side < 0:
+            print(f"{self.param}={lo} is already below 50% feasible; boundary is at or below the range")
+            self.refine(lo)
+            return float(lo)
+        if hi_side > 0:
+            print(f"{self.param}={hi} is still above 50% feasible; boundary is at or above the range")
+            self.refine(hi)
+            return float(hi)
+        if lo_side == 0:
+            hi = lo
+        elif hi_side == 0:
+            lo = hi
+        while hi - lo > 1:
+            mid = (lo + hi) // 2
+            s = self.side(mid)
+            print(f"{self.param}={mid}: {self.describe(mid)}")
+            if s > 0:
+                lo = mid
+            elif s < 0:
+                hi = mid
+            else:
+                lo = hi = mid
+        self.refine(lo)
+        self.refine(hi)
+        return self.boundary(lo, hi)
+
+    def boundary(self, lo: int, hi: int) -> float:
+        if lo == hi:
+            return float(lo)
+        p_lo = self.counts[lo][0] / self.counts[lo][1]
+        p_hi = self.counts[hi][0] / self.counts[hi][1]
+        if p_lo == p_hi:
+            return (lo + hi) / 2
+        # refinement can move either end across 0.5, so keep the estimate inside the bracket
+        t = min(1.0, max(0.0, (p_lo - 0.5) / (p_lo - p_hi)))
+        return lo + t * (hi - lo)
+
+    def describe(self, value: int) -> str:
+        feasible, total = self.counts[value]
+        lo, hi = self.interval(value)
+        return f"{feasible}/{total} feasible, CI [{lo:.2f}, {hi:.2f}]"
+
+    def curve(self) -> List[Dict[str, float]]:
+        rows = []
+        for value in sorted(self.counts):
+            feasible, total = self.counts[value]
+            lo, hi = self.interval(value)
+            rows.append({
+                self.param: value,
+                "feasible": feasible,
+                "total": total,
+                "fraction": feasible / total if total else float("nan"),
+                "ci_low": lo,
+                "ci_high": hi,
+            })
+        return rows
+
+
+def write_curve(path: str, rows: List[Dict[str, float]]) -> None:
+    if not rows:
+        return
+    with open(path, "w", newline='', encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Adaptive search for the 50% feasibility boundary of generated datasets")
+    p.add_argument("--param", choices=["r", "u"], default="u", help="parameter to sweep; the other is held fixed")
+    p.add_argument("--lo", type=int, default=0, help="lower end of the swept range")
+    p.add_argument("--hi", type=int, default=50, help="upper end of the swept range")
+    p.add_argument("--l", type=int, default=67, help="number of slots")
+    p.add_argument("--m", type=int, default=50, help="number of guards")
+    p.add_argument("--r", type=int, default=20, help="rejects per guard (ignored when --param r)")
+    p.add_argument("--u", type=int, default=30, help="total MUST-SELECT entries (ignored when --param u)")
+    p.add_argument("--seed", type=int, default=200, help="first random seed at every grid point")
+    p.add_argument("--batch", type=int, default=5, help="seeds added per round at a grid point")
+    p.add_argument("--min-seeds", type=int, default=10, help="seeds solved at a grid point before deciding its side")
+    p.add_argument("--max-seeds", type=int, default=50, help="maximum seeds solved at a grid point")
+    p.add_argument("--ci-width", type=float, default=0.1, help="target CI half-width on the feasible fraction")
+    p.add_argument("--confidence", type=float, default=0.95, help="confidence level for the Wilson interval")
+    p.add_argument("--out", type=str, default="sweep_data", help="output base directory for generated CSVs")
+    p.add_argument("--log", type=str, default="sweep_results.log", help="per-solve log in results.log format")
+    p.add_argument("--out-csv", type=str, default="sweep_curve.csv", help="phase-transition curve CSV")
+    return p.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.lo > args.hi:
+        raise SystemExit("--lo must not exceed --hi")
+    if args.batch < 1:
+        raise SystemExit("--batch must be at least 1")
+    if args.min_seeds > args.max_seeds:
+        raise SystemExit("--min-seeds must not exceed --max-seeds")
+    if args.log:
+        open(args.log, "w").close()
+    fixed = {"l": args.l, "m": args.m, "r": args.r, "u": args.u}
+    sweep = PhaseSweep(args.param, fixed, args.out, args.seed, args.batch, args.min_seeds,
+                       args.max_seeds, args.ci_width, args.confidence, args.log)
+    boundary = sweep.run(args.lo, args.hi)
+    rows = sweep.curve()
+    write_curve(args.out_csv, rows)
+
+    grid_points = args.hi - args.lo + 1
+    print("\nPhase-transition curve:")
+    for value in sorted(sweep.counts):
+        print(f"  {args.param}={value}: {sweep.describe(value)}")
+    print(f"Estimated 50% feasibility boundary: {args.param} = {boundary:.2f}")
+    print(f"Solves: {sweep.solves} (exhaustive grid: {grid_points * args.max_seeds})")
+    print(f"Saved curve to {args.out_csv}")
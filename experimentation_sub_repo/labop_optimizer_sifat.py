@@ -1,40 +1,91 @@
-import sys
+import argparse
 import pandas as pd
 import pulp as pl
 import os
+from screen_corpus import find_csvs, screen_corpus
 
-input_path = sys.argv[1]
-output_path = sys.argv[2]
-input_path = os.path.join(os.getcwd(), input_path)
-output_path = os.path.join(os.getcwd(), output_path)
-print(input_path)
-df = pd.read_csv(input_path)
-students = df.iloc[:,0].astype(str).tolist()
-print(students)
-slots = df.columns[7:].tolist()
-preferences = {(s,t):str(df.loc[i,t]).strip().upper() for i,s in enumerate(students) for t in slots}
-
-
-model=pl.LpProblem('slot_assignment',pl.LpMinimize)
-assign=pl.LpVariable.dicts('assign', [(s,t) for s in students for t in slots], 0, 1, pl.LpBinary)
-model += 0
-for s in students:
-    model += pl.lpSum(assign[(s,t)] for t in slots) >= 2
-    model += pl.lpSum(assign[(s,t)] for t in slots) <= 3
-for t in slots:
-    # model += pl.lpSum(assign[(s,t)] for s in students) >= 1
-    model += pl.lpSum(assign[(s,t)] for s in students) == 2
-for s in students:
+
+def load_instance(input_path):
+    df = pd.read_csv(input_path)
+    students = df.iloc[:,0].astype(str).tolist()
+    slots = df.columns[7:].tolist()
+    preferences = {(s,t):str(df.loc[i,t]).strip().upper() for i,s in enumerate(students) for t in slots}
+    return students, slots, preferences
+
+
+def build_model(students, slots, preferences):
+    model=pl.LpProblem('slot_assignment',pl.LpMinimize)
+    assign=pl.LpVariable.dicts('assign', [(s,t) for s in students for t in slots], 0, 1, pl.LpBinary)
+    model += 0
+    for s in students:
+        model += pl.lpSum(assign[(s,t)] for t in slots) >= 2
+        model += pl.lpSum(assign[(s,t)] for t in slots) <= 3
     for t in slots:
-        value = preferences[(s,t)]
-        if 'MUST' in value:
-            model += assign[(s,t)] == 1
-        if 'CANNOT-SELECT' in value:
-            model += assign[(s,t)] == 0
-model.solve()
-if pl.LpStatus[model.status]!='Optimal':
-    print('NO OPTIMAL ASSIGNMENT')
-else:
+        # model += pl.lpSum(assign[(s,t)] for s in students) >= 1
+        model += pl.lpSum(assign[(s,t)] for s in students) == 2
+    for s in students:
+        for t in slots:
+            value = preferences[(s,t)]
+            if 'MUST' in value:
+                model += assign[(s,t)] == 1
+            if 'CANNOT-SELECT' in value:
+                model += assign[(s,t)] == 0
+    return model, assign
+
+
+class ModelTemplate:
+    """The structural model for one (students x slots) shape, re-solved per instance.
+
+    Every file in a dataset folder such as dataset_r20_u30_m50_l67 has the same shape; only which
+    cells are MUST or CANNOT-SELECT changes, and those are just variable bounds. The 2-3 per student
+    and 2 per slot constraints are built once, and each instance only fixes its own cells (after
+    releasing the previous instance's) before solving again.
+    """
+
+    def __init__(self, n_students, n_slots):
+        self.shape = (n_students, n_slots)
+        students, slots = range(n_students), range(n_slots)
+        self.model=pl.LpProblem('slot_assignment',pl.LpMinimize)
+        self.assign=pl.LpVariable.dicts('assign', [(i,j) for i in students for j in slots], 0, 1, pl.LpBinary)
+        self.model += 0
+        for i in students:
+            self.model += pl.lpSum(self.assign[(i,j)] for j in slots) >= 2
+            self.model += pl.lpSum(self.assign[(i,j)] for j in slots) <= 3
+        for j in slots:
+            self.model += pl.lpSum(self.assign[(i,j)] for i in students) == 2
+        self.fixed = []
+
+    def solve(self, students, slots, preferences, solver=None):
+        """Fix this instance's MUST/CANNOT cells, solve, and return (status, assign keyed by (s,t))."""
+        for v in self.fixed:
+            v.lowBound, v.upBound = 0, 1
+        self.fixed = []
+        assign = {}
+        for i,s in enumerate(students):
+            for j,t in enumerate(slots):
+                v = self.assign[(i,j)]
+                assign[(s,t)] = v
+                value = preferences[(s,t)]
+                if 'MUST' in value:
+                    v.lowBound = 1
+                    self.fixed.append(v)
+                if 'CANNOT-SELECT' in value:
+                    v.upBound = 0
+                    self.fixed.append(v)
+        self.model.solve(solver or pl.PULP_CBC_CMD(msg=0))
+        return pl.LpStatus[self.model.status], assign
+
+
+_templates = {}
+
+
+def template_for(n_students, n_slots):
+    if (n_students, n_slots) not in _templates:
+        _templates[(n_students, n_slots)] = ModelTemplate(n_students, n_slots)
+    return _templates[(n_students, n_slots)]
+
+
+def write_assignment(students, slots, assign, output_path):
     rows=[]
     for s in students:
         chosen=[t for t in slots if pl.value(assign[(s,t)])>0.5][:3]
@@ -43,5 +94,76 @@ else:
     rows_slots=[]
     for t in slots:
         assigned_students = [s for s in students if pl.value(assign[(s,t)]) > 0.5]
-        rows_slots.append([t] + assigned_students)
-    pd.DataFrame(rows_slots, columns=['slot'] + students).to_csv(output_path.replace('.csv', '_by_slot.csv'), index=False)
\ No newline at end of file
+        rows_slots.append([t] + assigned_students[:2] + ['']*(2-len(assigned_students)))
+    pd.DataFrame(rows_slots, columns=['slot', 'student 1', 'student 2']).to_csv(output_path.replace('.csv', '_by_slot.csv'), index=False)
+
+
+def run_templates(input_dir, output_dir, log_path=None, screen=True):
+    """Solve every CSV under input_dir in-process, reusing one ModelTemplate per shape.
+
+    With screen, instances that screen_corpus.py proves infeasible are logged as Screened and
+    never reach the solver. Output names and log lines follow run_pipeline.sh, so plot_results.py
+    reads the log as is.
+    """
+    csv_files = find_csvs(input_dir)
+    if not csv_files:
+        print(f"No CSV files found in {input_dir}")
+        return
+    reasons = screen_corpus(csv_files) if screen else {}
+    log = open(log_path, 'w') if log_path else None
+    for count, f in enumerate(csv_files, 1):
+        rel_dir = os.path.dirname(os.path.relpath(f, input_dir))
+        prefix = rel_dir.replace(os.sep, '__') + '_' if rel_dir else ''
+        base = os.path.splitext(os.path.basename(f))[0]
+        out = os.path.join(output_dir, f"{prefix}{base}_assignment.csv")
+        if reasons.get(f):
+            print(f"[{count}/{len(csv_files)}] Screened: {f} ({', '.join(reasons[f])})")
+            if log:
+                log.write(f"{f},Screened\n")
+            continue
+        print(f"[{count}/{len(csv_files)}] Processing: {f}")
+        students, slots, preferences = load_instance(f)
+        status, assign = template_for(len(students), len(slots)).solve(students, slots, preferences)
+        if status != 'Optimal':
+            result = 'Infeasible'
+        else:
+            write_assignment(students, slots, assign, out)
+            result = 'Optimal'
+        if log:
+            log.write(f"{f},{result}\n")
+    if log:
+        log.close()
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Feasibility ILP for generated labop datasets")
+    p.add_argument('input', help='input CSV, or a folder of CSVs with --template')
+    p.add_argument('output', help='output CSV, or an existing output folder with --template')
+    p.add_argument('--template', action='store_true', help='solve a whole folder in-process, building the model once per shape')
+    p.add_argument('--log', default=None, help='with --template: results log in the run_pipeline.sh format')
+    p.add_argument('--no-screen', action='store_true', help='with --template: solve every instance, even ones screen_corpus.py rules out')
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.template:
+        run_templates(args.input, args.output, args.log, screen=not args.no_screen)
+        return
+    input_path = args.input
+    output_path = args.output
+    input_path = os.path.join(os.getcwd(), input_path)
+    output_path = os.path.join(os.getcwd(), output_path)
+    print(input_path)
+    students, slots, preferences = load_instance(input_path)
+    print(students)
+    model, assign = build_model(students, slots, preferences)
+    model.solve()
+    if pl.LpStatus[model.status]!='Optimal':
+        print('NO OPTIMAL ASSIGNMENT')
+    else:
+        write_assignment(students, slots, assign, output_path)
+
+
+if __name__ == '__main__':
+    main()
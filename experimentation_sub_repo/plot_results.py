@@ -34,24 +34,29 @@ def parse_log(path):
 
 
 def aggregate(results):
-    agg = defaultdict(lambda: {"Optimal": 0, "Infeasible": 0, "Other": 0})
+    agg = defaultdict(lambda: {"Optimal": 0, "Infeasible": 0, "Screened": 0, "Other": 0})
     for subdir, status in results:
         if status == "Optimal":
             agg[subdir]["Optimal"] += 1
         elif status == "Infeasible":
             agg[subdir]["Infeasible"] += 1
+        elif status == "Screened":
+            # proven infeasible by screen_corpus.py without a solver run
+            agg[subdir]["Screened"] += 1
         else:
             agg[subdir]["Other"] += 1
     rows = []
     for subdir, counts in sorted(agg.items()):
         opt = counts.get("Optimal", 0)
         inf = counts.get("Infeasible", 0)
-        total = opt + inf
+        scr = counts.get("Screened", 0)
+        total = opt + inf + scr
         pct = (100.0 * opt / total) if total > 0 else float('nan')
         rows.append({
             "dataset_subdir": subdir,
             "optimal": opt,
             "infeasible": inf,
+            "screened": scr,
             "percent_optimal": pct,
             "other": counts.get("Other", 0),
             "total_opt_inf": total,
@@ -66,6 +71,7 @@ def plot_df(df, out_img):
     x = range(len(labels))
     opt = df['optimal'].fillna(0).astype(int)
     inf = df['infeasible'].fillna(0).astype(int)
+    scr = df['screened'].fillna(0).astype(int)
     pct = df['percent_optimal']
 
     fig, ax1 = plt.subplots(figsize=(max(8, len(labels) * 0.6), 6))
@@ -73,6 +79,7 @@ def plot_df(df, out_img):
     width = 0.35
     ax1.bar([i - width/2 for i in x], opt, width, label='Optimal', color='#2ca02c')
     ax1.bar([i + width/2 for i in x], inf, width, label='Infeasible', color='#d62728')
+    ax1.bar([i + width/2 for i in x], scr, width, bottom=inf, label='Screened', color='#ff9896')
     ax1.set_xlabel('dataset_subdir')
     ax1.set_ylabel('Counts')
     ax1.set_xticks(list(x))
@@ -110,7 +117,7 @@ def main():
 
     df = aggregate(results)
 
-    out_df = df[['dataset_subdir', 'optimal', 'infeasible', 'percent_optimal']].copy()
+    out_df = df[['dataset_subdir', 'optimal', 'infeasible', 'screened', 'percent_optimal']].copy()
     out_df['percent_optimal'] = out_df['percent_optimal'].apply(lambda v: (f"{v:.1f}" if not (isinstance(v, float) and math.isnan(v)) else 'NaN'))
 
     print('\nAggregated results:')
@@ -0,0 +1,34 @@
+#!/usr/bin/env bash
+
+# how to use: ./run_large_benchmark.sh [students] [slots] [max_memory_mb] [work_dir]
+# Defaults: the 10000 students x 12000 slots run under a 1500 MB ceiling, files in ./large_benchmark
+# Generates a dataset with labop_distribution.py (20 allowed slots per student, one MUST-SELECT for
+# every tenth student), converts it with to_responses.py and solves it with schedule.py --large --check.
+# Small sizes (e.g. ./run_large_benchmark.sh 50 60) make a smoke test; CONTIGUOUS runs can use all of
+# CBC's 60 s time limit at any size.
+set -e
+students="${1:-10000}"
+slots="${2:-12000}"
+max_memory="${3:-1500}"
+work_dir="${4:-./large_benchmark}"
+seed=5
+rejects=$((slots - 20))
+musts=$((students / 10))
+
+if [ "$rejects" -lt 0 ]; then
+  echo "Need at least 20 slots, got $slots"
+  exit 1
+fi
+
+generated="$work_dir/dataset_r${rejects}_u${musts}_m${students}_l${slots}/combined_s${seed}.csv"
+responses="$work_dir/responses_m${students}_l${slots}.csv"
+
+if [ ! -f "$generated" ]; then
+  python labop_distribution.py --m "$students" --l "$slots" --r "$rejects" --u "$musts" --out "$work_dir" --seed "$seed"
+fi
+if [ ! -f "$responses" ]; then
+  python to_responses.py "$generated" "$responses"
+fi
+
+# schedule.py reads the mode (CONTIGUOUS/SPREAD) from ../config.py
+time python ../schedule.py "$responses" "$work_dir/schedule_m${students}_l${slots}.csv" --large --max-memory "$max_memory" --check
@@ -14,6 +14,17 @@ if [ ! -d "$output_dir" ]; then
   exit 1
 fi
 
+# TEMPLATE=1 ./run_pipeline.sh solves the whole folder in one process, building the model once per shape
+if [ -n "$TEMPLATE" ]; then
+  if [ "$SCREEN" = "0" ]; then
+    python labop_optimizer_sifat.py --template "$input_dir" "$output_dir" --log "$log" --no-screen
+  else
+    python labop_optimizer_sifat.py --template "$input_dir" "$output_dir" --log "$log"
+  fi
+  echo "Finished. Results saved to $log and outputs in $output_dir"
+  exit 0
+fi
+
 mapfile -t csv_files < <(find "$input_dir" -type f -name "*.csv")
 
 if [ ${#csv_files[@]} -eq 0 ]; then
@@ -21,6 +32,14 @@ if [ ${#csv_files[@]} -eq 0 ]; then
   exit 1
 fi
 
+# instances screen_corpus.py proves infeasible are logged as Screened without a solve (SCREEN=0 disables)
+declare -A screened
+if [ "$SCREEN" != "0" ]; then
+  while IFS= read -r f; do
+    [ -n "$f" ] && screened["$f"]=1
+  done < <(python screen_corpus.py "$input_dir" --list)
+fi
+
 count=0
 total=${#csv_files[@]}
 for f in "${csv_files[@]}"; do
@@ -37,6 +56,12 @@ for f in "${csv_files[@]}"; do
 
   out="$output_dir/${prefix}${base}_assignment.csv"
 
+  if [ -n "${screened[$f]}" ]; then
+    echo "[$count/$total] Screened: $f"
+    echo "$f,Screened" >> "$log"
+    continue
+  fi
+
   echo "[$count/$total] Processing: $f"
   msg=$(python labop_optimizer_sifat.py "$f" "$out" 2>&1)
 
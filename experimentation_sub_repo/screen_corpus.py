@@ -0,0 +1,129 @@
+"""Screen a corpus of generated labop datasets for instances that cannot be feasible.
+
+python screen_corpus.py sample_data_labops --out-csv screen.csv
+
+    input_dir = folder searched recursively for CSVs (same as run_pipeline.sh)
+    --list = only print the paths of screened-out instances, one per line
+    --out-csv = optional CSV with one row per instance and one column per condition
+
+Every CSV is read once and instances of the same shape are stacked into one
+(instance x student x slot) tensor, so each condition below is a handful of array reductions
+over the whole corpus rather than a CBC run per file. The conditions are necessary for the
+feasibility model in labop_optimizer_sifat.py (2-3 slots per student, exactly 2 students per
+slot, MUST cells fixed to 1, CANNOT-SELECT cells fixed to 0):
+
+    slot_short    = some slot has fewer than 2 students who are not CANNOT-SELECT
+    slot_must     = some slot has more than 2 MUST entries
+    capacity      = the 2 * slots seats fall outside [2 * students, 3 * students]
+    student_must  = some student is forced into more than 3 slots by MUST entries
+    student_short = some student has fewer than 2 slots that are not CANNOT-SELECT
+
+An instance failing any of them is proven infeasible and can skip the solver. Passing all of them
+does not prove feasibility.
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import os
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+MIN_SLOTS_PER_STUDENT = 2
+MAX_SLOTS_PER_STUDENT = 3
+STUDENTS_PER_SLOT = 2
+CONDITIONS = ("slot_short", "slot_must", "capacity", "student_must", "student_short")
+
+
+def find_csvs(input_dir: str) -> List[str]:
+    """All CSVs under input_dir, in the order run_pipeline.sh and --template process them."""
+    return sorted(
+        os.path.join(root, name)
+        for root, _, names in os.walk(input_dir)
+        for name in names if name.endswith(".csv")
+    )
+
+
+def load_corpus(paths: List[str]) -> Dict[Tuple[int, int], Tuple[List[str], np.ndarray]]:
+    """Group instances by (students, slots) and stack each group into one string tensor."""
+    groups: Dict[Tuple[int, int], Tuple[List[str], List[np.ndarray]]] = {}
+    for path in paths:
+        cells = pd.read_csv(path, dtype=str, keep_default_na=False).iloc[:, 7:].to_numpy(dtype=str)
+        names, stack = groups.setdefault(cells.shape, ([], []))
+        names.append(path)
+        stack.append(cells)
+    return {shape: (names, np.stack(stack)) for shape, (names, stack) in groups.items()}
+
+
+def encode(cells: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """MUST and CANNOT-SELECT masks of a cell tensor, matched the way load_instance/build_model do."""
+    cells = np.char.upper(np.char.strip(cells))
+    must = np.char.find(cells, "MUST") >= 0
+    cannot = np.char.find(cells, "CANNOT-SELECT") >= 0
+    return must, cannot
+
+
+def screen(must: np.ndarray, cannot: np.ndarray) -> Dict[str, np.ndarray]:
+    """Evaluate every condition for a stack of same-shape instances.
+
+    must and cannot are (instance x student x slot) bool tensors. Returns one bool array of length
+    n_instances per condition, True where the instance fails it.
+    """
+    n_instances, n_students, n_slots = must.shape
+    allowed = ~cannot
+    seats = STUDENTS_PER_SLOT * n_slots
+    capacity_ok = MIN_SLOTS_PER_STUDENT * n_students <= seats <= MAX_SLOTS_PER_STUDENT * n_students
+    return {
+        "slot_short": (allowed.sum(axis=1) < STUDENTS_PER_SLOT).any(axis=1),
+        "slot_must": (must.sum(axis=1) > STUDENTS_PER_SLOT).any(axis=1),
+        "capacity": np.full(n_instances, not capacity_ok),
+        "student_must": (must.sum(axis=2) > MAX_SLOTS_PER_STUDENT).any(axis=1),
+        "student_short": (allowed.sum(axis=2) < MIN_SLOTS_PER_STUDENT).any(axis=1),
+    }
+
+
+def screen_corpus(paths: List[str]) -> Dict[str, List[str]]:
+    """Map every path to the conditions it fails; an empty list means it was not screened out."""
+    reasons: Dict[str, List[str]] = {}
+    for names, cells in load_corpus(paths).values():
+        failed = screen(*encode(cells))
+        for k, path in enumerate(names):
+            reasons[path] = [c for c in CONDITIONS if failed[c][k]]
+    return reasons
+
+
+def write_report(path: str, reasons: Dict[str, List[str]]) -> None:
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["path", "screened"] + list(CONDITIONS))
+        for p, failed in reasons.items():
+            writer.writerow([p, int(bool(failed))] + [int(c in failed) for c in CONDITIONS])
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Screen generated labop datasets for provably infeasible instances")
+    p.add_argument("input_dir", help="folder searched recursively for CSVs")
+    p.add_argument("--list", action="store_true", help="only print the paths of screened-out instances")
+    p.add_argument("--out-csv", type=str, default=None, help="optional per-instance report CSV")
+    return p.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    paths = find_csvs(args.input_dir)
+    reasons = screen_corpus(paths)
+    screened = [p for p in paths if reasons[p]]
+    if args.list:
+        print("\n".join(screened))
+    else:
+        for p in screened:
+            print(f"{p}: {', '.join(reasons[p])}")
+        counts = {c: sum(c in reasons[p] for p in paths) for c in CONDITIONS}
+        print(f"\nScreened out {len(screened)} of {len(paths)} instances")
+        for c in CONDITIONS:
+            print(f"  {c}: {counts[c]}")
+    if args.out_csv:
+        write_report(args.out_csv, reasons)
@@ -0,0 +1,46 @@
+"""Convert a labop_distribution.py CSV into the survey responses format schedule.py reads.
+
+python to_responses.py combined_s5.csv responses_large.csv
+
+    input = combined CSV written by labop_distribution.py
+    output = CSV in the format of ../responses.csv
+
+The generator writes 7 metadata columns (Id, Start time, Completion time, Email, Name, Last name,
+First name) and MUST-SELECT / CANNOT-SELECT / OK cells. The survey export has 8 (ID, ..., Name,
+Last modified time, Last name, First name) and MUST-HAVE / UNAVAILABLE / AVAILABLE cells. Rows are
+converted one at a time, so generated files too large for pandas can be fed to schedule.py --large.
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+
+CELLS = {"MUST-SELECT": "MUST-HAVE", "CANNOT-SELECT": "UNAVAILABLE", "OK": "AVAILABLE"}
+
+
+def convert(input_path: str, output_path: str) -> int:
+    """Write output_path in the responses format; returns the number of rows converted."""
+    n = 0
+    with open(input_path, newline="", encoding="utf-8") as src, open(output_path, "w", newline="", encoding="utf-8") as dst:
+        reader = csv.reader(src)
+        writer = csv.writer(dst)
+        header = next(reader)
+        writer.writerow(["ID"] + header[1:5] + ["Last modified time"] + header[5:])
+        for row in reader:
+            writer.writerow(row[:5] + [""] + row[5:7] + [CELLS.get(c, c) for c in row[7:]])
+            n += 1
+    return n
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Convert a generated labop CSV into the survey responses format")
+    p.add_argument("input", help="combined CSV written by labop_distribution.py")
+    p.add_argument("output", help="responses CSV to write")
+    return p.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    n = convert(args.input, args.output)
+    print(f"Wrote {n} responses to {args.output}")
@@ -0,0 +1,235 @@
+"""Lagrangian decomposition of the CONTIGUOUS schedule model.
+
+The only constraint linking students in schedule.py is "every slot gets exactly 2 students".
+Pricing it with one multiplier per slot splits the model into one small problem per student:
+pick 2-3 allowed slots (all MUST-HAVE slots, no UNAVAILABLE ones) maximising the number of
+back-to-back pairs minus the prices of the chosen slots. Each of those is solved exactly by a
+dynamic program over the slot sequence with state (slots taken so far, previous slot taken), and
+the DP runs for all students at once as numpy array operations.
+
+For any prices the summed DP values plus 2 * sum(prices) bound the best contiguity from above.
+Subgradient steps on the prices tighten that bound, and every few iterations the current DP
+choice is repaired into a feasible schedule whose contiguity is a lower bound. When the two meet
+the repaired schedule is optimal.
+"""
+from dataclasses import dataclass
+import numpy as np
+import pulp as pl
+from config import MIN_SLOTS_PER_STUDENT, MAX_SLOTS_PER_STUDENT, STUDENTS_PER_SLOT
+
+
+@dataclass
+class LagrangianResult:
+    assignment: object  # students x slots bool matrix, or None if no schedule was found
+    lower_bound: float  # contiguity of `assignment` (-inf when there is none)
+    upper_bound: float  # best Lagrangian bound on the optimal contiguity
+    iterations: int
+    optimal: bool
+    infeasible: bool = False
+
+
+def contiguity(assignment):
+    """Number of back-to-back slot pairs per schedule, the quantity CONTIGUOUS mode maximises."""
+    return int((assignment[:, 1:] & assignment[:, :-1]).sum())
+
+
+def solve_students(prices, must, unavailable, weight=1.0):
+    """Solve every student's priced subproblem exactly.
+
+    Returns (values, choice): the best objective per student and the students x slots bool matrix
+    that achieves it. Students with no valid choice get value -inf.
+    """
+    n_students, n_slots = must.shape
+    k_max = MAX_SLOTS_PER_STUDENT
+    neg = -np.inf
+    # value[s, k, p]: best score after the current slot with k slots taken, p = current slot taken
+    value = np.full((n_students, k_max + 1, 2), neg)
+    value[:, 0, 0] = 0.0
+    skip_from = np.zeros((n_slots, n_students, k_max + 1), dtype=bool)
+    take_from = np.zeros((n_slots, n_students, k_max + 1), dtype=bool)
+
+    for t in range(n_slots):
+        skip = np.maximum(value[:, :, 0], value[:, :, 1])
+        skip_from[t] = value[:, :, 1] > value[:, :, 0]
+        skip[must[:, t]] = neg
+
+        from_free = value[:, :-1, 0] - prices[t]
+        from_taken = value[:, :-1, 1] + weight - prices[t]
+        take = np.full((n_students, k_max + 1), neg)
+        take[:, 1:] = np.maximum(from_free, from_taken)
+        take_from[t, :, 1:] = from_taken > from_free
+        take[unavailable[:, t]] = neg
+
+        value[:, :, 0] = skip
+        value[:, :, 1] = take
+
+    final = value[:, MIN_SLOTS_PER_STUDENT:, :].reshape(n_students, -1)
+    best = final.argmax(axis=1)
+    values = final[np.arange(n_students), best]
+    k = best // 2 + MIN_SLOTS_PER_STUDENT
+    p = best % 2
+
+    choice = np.zeros((n_students, n_slots), dtype=bool)
+    rows = np.arange(n_students)
+    for t in range(n_slots - 1, -1, -1):
+        taken = p == 1
+        choice[:, t] = taken
+        prev = np.where(taken, take_from[t, rows, k], skip_from[t, rows, k])
+        k = k - taken
+        p = prev.astype(int)
+    choice[np.isneginf(values)] = False
+    return values, choice
+
+
+def repair(choice, must, unavailable, weight=1.0):
+    """Turn a DP choice into a feasible schedule, or None if the instance is infeasible.
+
+    Without the contiguity terms the model is a bipartite b-matching (students 2-3, slots exactly 2),
+    so its LP is integral. The repair solves that small transportation model, rewarding cells the
+    DP picked and cells next to them so as much of the DP's block structure as possible survives.
+    """
+    n_students, n_slots = must.shape
+    near = np.zeros(choice.shape)
+    near[:, 1:] += choice[:, :-1]
+    near[:, :-1] += choice[:, 1:]
+    reward = 2.0 * choice + weight * near
+
+    model = pl.LpProblem("repair", pl.LpMaximize)
+    cells = list(zip(*np.nonzero(~unavailable)))
+    y = {c: pl.LpVariable(f"y_{c[0]}_{c[1]}", 0, 1) for c in cells}
+    by_student = [[] for _ in range(n_students)]
+    by_slot = [[] for _ in range(n_slots)]
+    for (i, j), v in y.items():
+        by_student[i].append(v)
+        by_slot[j].append(v)
+        if must[i, j]:
+            v.lowBound = 1
+    model += pl.lpSum(reward[i, j] * v for (i, j), v in y.items())
+    for vs in by_student:
+        model += pl.lpSum(vs) >= MIN_SLOTS_PER_STUDENT
+        model += pl.lpSum(vs) <= MAX_SLOTS_PER_STUDENT
+    for vs in by_slot:
+        model += pl.lpSum(vs) == STUDENTS_PER_SLOT
+    model.solve(pl.PULP_CBC_CMD(msg=0))
+    if pl.LpStatus[model.status] != "Optimal":
+        return None
+    assignment = np.zeros(must.shape, dtype=bool)
+    for (i, j), v in y.items():
+        assignment[i, j] = (v.varValue or 0) > 0.5
+    return assignment
+
+
+def _neighbours(a):
+    """For every cell, how many of the row's adjacent slots are assigned."""
+    n = np.zeros(a.shape, dtype=int)
+    n[..., 1:] += a[..., :-1]
+    n[..., :-1] += a[..., 1:]
+    return n
+
+
+def improve(assignment, must, unavailable):
+    """Feasibility-preserving local search on contiguity.
+
+    For every assigned, non-MUST-HAVE cell (i, j) it tries two moves and applies the best one
+    that strictly improves contiguity: another student under the cap takes over slot j
+    (if i keeps at least 2 slots), or i swaps slot j for a slot k held by some student b who
+    moves into j. Both keep every slot at exactly 2 students, so feasibility is never lost.
+    """
+    a = assignment.copy()
+    improved = True
+    while improved:
+        improved = False
+        for i, j in zip(*np.nonzero(a & ~must)):
+            if not a[i, j]:
+                continue
+            load = a.sum(axis=1)
+            near = _neighbours(a)
+            loss_i = near[i, j]
+
+            best, move = 0, None
+            if load[i] > MIN_SLOTS_PER_STUDENT:
+                takers = ~a[:, j] & ~unavailable[:, j] & (load < MAX_SLOTS_PER_STUDENT)
+                if takers.any():
+                    gain = np.where(takers, near[:, j], -1)
+                    c = int(gain.argmax())
+                    if gain[c] - loss_i > best:
+                        best, move = gain[c] - loss_i, ("take", c, None)
+
+            row_i = a[i].copy()
+            row_i[j] = False
+            gain_i = _neighbours(row_i)
+            # b's gain from moving into j, not counting the slot k it leaves when k touches j
+            gain_b = near[:, j][:, None] - (np.abs(np.arange(a.shape[1]) - j) == 1)[None, :]
+            valid = (a & ~must & ~a[:, j][:, None] & ~unavailable[:, j][:, None]
+                     & ~(a[i] | unavailable[i])[None, :])
+            if valid.any():
+                delta = np.where(valid, gain_i[None, :] - loss_i + gain_b - near, -1)
+                b, k = np.unravel_index(delta.argmax(), delta.shape)
+                if delta[b, k] > best:
+                    best, move = delta[b, k], ("swap", int(b), int(k))
+
+            if move is None:
+                continue
+            kind, b, k = move
+            a[i, j] = False
+            a[b, j] = True
+            if kind == "swap":
+                a[b, k] = False
+                a[i, k] = True
+            improved = True
+    return a
+
+
+def solve_lagrangian(must, unavailable, contiguous=True, max_iter=300, repair_every=10, theta=2.0, patience=15,
+                     progress=None):
+    """Subgradient optimisation of the slot prices with periodic repair.
+
+    Stops once the repaired schedule's contiguity reaches the floor of the Lagrangian bound, or
+    after max_iter iterations. theta is the Polyak step scale; it is halved when the bound has not
+    improved for `patience` iterations. If given, progress(iteration, lower, upper) is called
+    after every repair.
+    """
+    must = np.asarray(must, dtype=bool)
+    unavailable = np.asarray(unavailable, dtype=bool)
+    weight = 1.0 if contiguous else 0.0
+    n_slots = must.shape[1]
+    prices = np.zeros(n_slots)
+
+    best_assignment, lower, upper = None, -np.inf, np.inf
+    stale = 0
+    for it in range(1, max_iter + 1):
+        values, choice = solve_students(prices, must, unavailable, weight)
+        if np.isneginf(values).any():
+            # some student has no 2-3 slot choice at all, whatever the prices
+            return LagrangianResult(None, -np.inf, -np.inf, it, False, infeasible=True)
+        bound = values.sum() + STUDENTS_PER_SLOT * prices.sum()
+        if bound < upper - 1e-9:
+            upper, stale = bound, 0
+        else:
+            stale += 1
+            if stale >= patience:
+                theta, stale = theta / 2, 0
+
+        if it == 1 or it % repair_every == 0:
+            assignment = repair(choice, must, unavailable, weight)
+            if assignment is None:
+                return LagrangianResult(None, -np.inf, upper, it, False, infeasible=True)
+            if contiguous:
+                assignment = improve(assignment, must, unavailable)
+            score = contiguity(assignment) * weight
+            if score > lower:
+                best_assignment, lower = assignment, score
+            if progress is not None:
+                progress(it, lower, upper)
+
+        if lower >= np.floor(upper + 1e-9):
+            return LagrangianResult(best_assignment, lower, upper, it, True)
+
+        gradient = STUDENTS_PER_SLOT - choice.sum(axis=0)
+        norm = float(gradient @ gradient)
+        if norm == 0:
+            # the DP choice already satisfies every slot, so it is feasible and optimal
+            return LagrangianResult(choice, contiguity(choice) * weight, upper, it, True)
+        prices -= theta * (bound - lower) / norm * gradient
+
+    return LagrangianResult(best_assignment, lower, upper, max_iter, False)
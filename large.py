@@ -0,0 +1,280 @@
+"""Memory-bounded path through schedule.py for very large response files.
+
+The normal path holds the whole responses DataFrame, a students x slots string array, one PuLP
+variable per cell and (in CONTIGUOUS mode) one per neighbouring pair, all at once. Here:
+
+- the CSV is read one row at a time and each row is reduced to the slots the student may take
+  (sparse arrays: row offsets, slot indices, MUST-HAVE flags), then dropped;
+- only those cells become variables, and the LP file for CBC is written constraint by constraint
+  from the arrays, so no model object is ever built in Python;
+- CBC's solution file is read line by line into one bool per cell, and both schedule views are
+  streamed from the chosen cells by the normal writers.
+
+A memory ceiling (set_memory_limit) caps the data memory of this process and of CBC, so a run
+that would not fit fails with a clear error instead of exhausting the host.
+"""
+import csv
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+from itertools import chain, islice
+from dataclasses import dataclass
+import numpy as np
+import pulp as pl
+from config import MIN_SLOTS_PER_STUDENT, MAX_SLOTS_PER_STUDENT, STUDENTS_PER_SLOT
+
+TERMS_PER_LINE = 500
+CBC_NOT_STARTED = -1  # CBC peak RSS reported when the run ends before CBC is launched
+
+
+@dataclass
+class Responses:
+    students: list  # email per response row
+    slots: list
+    info: list  # (id, last name, first name) per row
+    indptr: np.ndarray  # row i's allowed cells are indptr[i]:indptr[i + 1]
+    indices: np.ndarray  # slot index of every allowed cell, ascending within a row
+    must: np.ndarray  # MUST-HAVE flag of every allowed cell
+    conflicts: int = 0  # cells marked both MUST-HAVE and UNAVAILABLE, which no schedule satisfies
+
+    @property
+    def rows(self):
+        """Student index of every allowed cell."""
+        return np.repeat(np.arange(len(self.students), dtype=np.int32), np.diff(self.indptr))
+
+
+def set_memory_limit(megabytes):
+    """Cap the data memory (heap and anonymous mappings) of this process and of CBC.
+
+    RLIMIT_DATA rather than RLIMIT_AS: numpy and PuLP reserve far more address space than they
+    use, while the data size tracks resident memory closely. CBC inherits the limit.
+    """
+    _, hard = resource.getrlimit(resource.RLIMIT_DATA)
+    limit = megabytes * 1024 * 1024
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_DATA, (limit, hard))
+
+
+def peak_rss():
+    """Peak resident set size of this process in MB (ru_maxrss is in KB on Linux, bytes on macOS)."""
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def _vm_hwm(pid):
+    """Peak RSS in MB of a running process from /proc (Linux), or 0 if it cannot be read."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0
+
+
+def _unique(names):
+    """Rename repeated column names the way pandas.read_csv does (X, X.1, X.2, ...)."""
+    seen, out = {}, []
+    for name in names:
+        n = seen.get(name, 0)
+        seen[name] = n + 1
+        out.append(f"{name}.{n}" if n else name)
+    return out
+
+
+def read_responses(path):
+    """Stream the responses CSV into a Responses; at most one raw row is held at a time."""
+    students, info = [], []
+    indptr = [0]
+    indices, must = [], []
+    conflicts = 0
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = _unique(next(reader))
+        slots = header[8:]
+        id_col, last_col, first_col = (header.index(c) for c in ("ID", "Last name", "First name"))
+        for row in reader:
+            prefs = np.char.upper(np.array(row[8:], dtype=str))
+            unavailable = np.char.find(prefs, "UNAVAILABLE") >= 0
+            row_must = np.char.find(prefs, "MUST-HAVE") >= 0
+            conflicts += int((row_must & unavailable).sum())
+            row_allowed = np.flatnonzero(~unavailable).astype(np.int32)
+            indices.append(row_allowed)
+            must.append(row_must[row_allowed])
+            indptr.append(indptr[-1] + len(row_allowed))
+            students.append(row[3])
+            info.append((row[id_col], row[last_col], row[first_col]))
+    return Responses(
+        students,
+        slots,
+        info,
+        np.array(indptr, dtype=np.int64),
+        np.concatenate(indices) if indices else np.zeros(0, dtype=np.int32),
+        np.concatenate(must) if must else np.zeros(0, dtype=bool),
+        conflicts,
+    )
+
+
+def _terms(f, names, sep=" + "):
+    """Write names joined by sep, TERMS_PER_LINE per line, so a long sum is never one string."""
+    names = iter(names)
+    chunk = list(islice(names, TERMS_PER_LINE))
+    first = True
+    while chunk:
+        f.write((" " if first else sep.rstrip() + " ") + sep.join(chunk) + "\n")
+        first = False
+        chunk = list(islice(names, TERMS_PER_LINE))
+
+
+def write_lp(resp, path, contiguous):
+    """Write the schedule model for `resp` in CPLEX LP format, one constraint at a time.
+
+    Variable x<k> is allowed cell k. In CONTIGUOUS mode y<p> marks that a student holds both cells
+    of the p-th neighbouring pair; only the y <= x sides are needed since y is maximised.
+    Returns the number of pair variables.
+    """
+    n_cells = len(resp.indices)
+    rows = resp.rows
+    pairs = np.flatnonzero((np.diff(resp.indices) == 1) & (np.diff(rows) == 0)) if contiguous else np.zeros(0, int)
+    del rows
+
+    with open(path, "w") as f:
+        if contiguous and len(pairs):
+            f.write("Maximize\n obj:")
+            _terms(f, (f"y{p}" for p in range(len(pairs))))
+        else:
+            f.write("Minimize\n obj: 0 x0\n")
+
+        f.write("Subject To\n")
+        for i in range(len(resp.students)):
+            cells = [f"x{k}" for k in range(resp.indptr[i], resp.indptr[i + 1])]
+            if not cells:
+                # a student with no allowed slot: 0 >= 2 can never hold
+                f.write(f" min{i}: 0 x0 >= {MIN_SLOTS_PER_STUDENT}\n")
+                continue
+            f.write(f" min{i}:")
+            _terms(f, cells)
+            f.write(f" >= {MIN_SLOTS_PER_STUDENT}\n max{i}:")
+            _terms(f, cells)
+            f.write(f" <= {MAX_SLOTS_PER_STUDENT}\n")
+
+        by_slot = np.argsort(resp.indices, kind="stable")
+        bounds = np.searchsorted(resp.indices[by_slot], np.arange(len(resp.slots) + 1))
+        for j in range(len(resp.slots)):
+            cells = [f"x{k}" for k in by_slot[bounds[j]:bounds[j + 1]]]
+            f.write(f" slot{j}:")
+            _terms(f, cells or ["0 x0"])
+            f.write(f" = {STUDENTS_PER_SLOT}\n")
+        del by_slot, bounds
+
+        for p, k in enumerate(pairs):
+            f.write(f" a{p}: y{p} - x{k} <= 0\n b{p}: y{p} - x{k + 1} <= 0\n")
+
+        f.write("Bounds\n")
+        for k in np.flatnonzero(resp.must):
+            f.write(f" x{k} = 1\n")
+
+        f.write("Binaries\n")
+        _terms(f, chain((f"x{k}" for k in range(n_cells)), (f"y{p}" for p in range(len(pairs)))), sep=" ")
+        f.write("End\n")
+    return len(pairs)
+
+
+def run_cbc(lp_path, solution_path, time_limit=60, log_path=None):
+    """Run the CBC binary bundled with PuLP on an LP file.
+
+    Returns (status line of the solution, CBC's peak RSS in MB). The peak is sampled from /proc
+    while CBC runs, since getrusage would also count the memory the forked child shared with us;
+    it is None where there is no /proc (macOS).
+    """
+    sample = os.path.exists("/proc/self/status")
+    cmd = [pl.PULP_CBC_CMD().path, lp_path, "-sec", str(time_limit), "-timeMode", "elapsed",
+           "-branch", "-printingOptions", "normal", "-solution", solution_path]
+    peak = 0 if sample else None
+    with open(log_path or os.devnull, "w") as log:
+        proc = subprocess.Popen(cmd, stdout=log, stderr=subprocess.STDOUT)
+        while True:
+            if sample:
+                peak = max(peak, _vm_hwm(proc.pid))
+            try:
+                proc.wait(timeout=0.01)
+                break
+            except subprocess.TimeoutExpired:
+                pass
+    if proc.returncode < 0 and resource.getrlimit(resource.RLIMIT_DATA)[0] != resource.RLIM_INFINITY:
+        # CBC aborts (SIGABRT on bad_alloc) when it runs into the ceiling set by set_memory_limit
+        error = MemoryError("CBC stopped by the memory ceiling")
+        error.peak = peak
+        raise error
+    if not os.path.exists(solution_path):
+        return f"Not Solved (CBC exit code {proc.returncode})", peak
+    with open(solution_path) as f:
+        return f.readline().strip(), peak
+
+
+def read_solution(solution_path, n_cells):
+    """Stream CBC's solution file into one bool per allowed cell."""
+    chosen = np.zeros(n_cells, dtype=bool)
+    with open(solution_path) as f:
+        next(f)
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 3 and parts[1].startswith("x") and float(parts[2]) > 0.5:
+                chosen[int(parts[1][1:])] = True
+    return chosen
+
+
+def _has_solution(status):
+    """Whether a CBC solution status line comes with a schedule, read the way PuLP reads it.
+
+    "Optimal - objective value 80" does, and so does a run stopped by the time limit after finding
+    an incumbent ("Stopped on time - objective value 77"); PuLP reports both as Optimal.
+    """
+    words = status.split()
+    if not words:
+        return False
+    return words[0] == "Optimal" or (words[0] == "Stopped" and len(words) >= 5 and words[4] == "objective")
+
+
+def solve_large(resp, contiguous, time_limit=60, log_path=None):
+    """Solve the sparse model with CBC; returns (one bool per allowed cell or None, CBC peak RSS in MB).
+
+    The peak is None where it cannot be sampled and CBC_NOT_STARTED if CBC never ran.
+    """
+    if resp.conflicts:
+        print(f"{resp.conflicts} cells are both MUST-HAVE and UNAVAILABLE")
+        return None, CBC_NOT_STARTED
+    with tempfile.TemporaryDirectory() as tmp:
+        lp_path = os.path.join(tmp, "model.lp")
+        solution_path = os.path.join(tmp, "model.sol")
+        n_pairs = write_lp(resp, lp_path, contiguous)
+        print(f"Model: {len(resp.indices)} cell variables, {n_pairs} pair variables")
+        status, peak = run_cbc(lp_path, solution_path, time_limit, log_path)
+        print(f"CBC: {status}")
+        if not _has_solution(status):
+            return None, peak
+        return read_solution(solution_path, len(resp.indices)), peak
+
+
+def check_chosen(resp, chosen):
+    """The check_output.py checks on the sparse schedule; returns a list of problems (empty if valid).
+
+    Only allowed cells can be chosen, so UNAVAILABLE and duplicate cells cannot occur here.
+    """
+    problems = []
+    load = np.bincount(resp.rows[chosen], minlength=len(resp.students))
+    staffed = np.bincount(resp.indices[chosen], minlength=len(resp.slots))
+    wrong_load = int(((load < MIN_SLOTS_PER_STUDENT) | (load > MAX_SLOTS_PER_STUDENT)).sum())
+    if wrong_load:
+        problems.append(f"{wrong_load} students without 2-3 slots")
+    wrong_staff = int((staffed != STUDENTS_PER_SLOT).sum())
+    if wrong_staff:
+        problems.append(f"{wrong_staff} slots without exactly 2 students")
+    missing = int((resp.must & ~chosen).sum())
+    if missing:
+        problems.append(f"{missing} MUST-HAVE cells not assigned")
+    return problems
@@ -1,103 +1,390 @@
-import sys
+## python schedule.py responses.csv schedule.csv [--backend ilp|lagrangian|bitset] [--warm-start] [--window N [--overlap K]] [--format csv|json|parquet] [--check] [--large [--max-memory MB]]
+import argparse
+import csv
+import json
+import math
+import os
+import numpy as np
 import pandas as pd
 import pulp as pl
-import os
 import config
+import check_output
+from substitutes import SubstituteIndex
+from lagrangian import solve_lagrangian
+from bitset import solve_bitset
 
-input_path = os.path.join(os.getcwd(), sys.argv[1])
-output_path = os.path.join(os.getcwd(), sys.argv[2])
+OUTPUT_FORMATS = ("csv", "json", "parquet")
+BACKENDS = ("ilp", "lagrangian", "bitset")
 
-df = pd.read_csv(input_path)
+STUDENT_COLUMNS = [
+    "student_id",
+    "student_email",
+    "student_last_name",
+    "student_first_name",
+    "slot 1",
+    "slot 2",
+    "slot 3",
+]
+SLOT_COLUMNS = ["slot", "student 1", "student 2"]
 
-students = df.iloc[:, 3].astype(str).tolist()
-slots = df.columns[8:].tolist()
 
-preferences = {
-    (s, t): str(df.loc[i, t]).strip().upper()
-    for i, s in enumerate(students)
-    for t in slots
-}
+def preference_masks(df, slots):
+    """Return (must, unavailable) boolean students x slots matrices for the response cells."""
+    prefs = np.char.upper(np.char.strip(df[slots].astype(str).to_numpy(dtype=str)))
+    return np.char.find(prefs, "MUST-HAVE") >= 0, np.char.find(prefs, "UNAVAILABLE") >= 0
 
-model = pl.LpProblem("slot_assignment", pl.LpMinimize)
 
-assign = pl.LpVariable.dicts(
-    "assign",
-    [(s, t) for s in students for t in slots],
-    0,
-    1,
-    pl.LpBinary
-)
+def build_model(students, slots, must, unavailable, lookahead=0, carry=None,
+                min_slots=config.MIN_SLOTS_PER_STUDENT):
+    """Build the PuLP model over `slots`.
 
-for s in students:
-    model += pl.lpSum(assign[(s, t)] for t in slots) >= 2
-    model += pl.lpSum(assign[(s, t)] for t in slots) <= 3
+    The rolling horizon uses the extra arguments; the defaults give the single flat model.
+    The last `lookahead` slots are staffed like the others but only count against the 3-slot
+    cap, and `carry` marks the students assigned to the slot just before slots[0], so that
+    continuing into slots[0] counts towards contiguity.
+    """
+    model = pl.LpProblem("slot_assignment", pl.LpMinimize)
+    committed = slots[:len(slots) - lookahead]
+    ahead = slots[len(slots) - lookahead:] if lookahead else []
 
-for t in slots:
-    model += pl.lpSum(assign[(s, t)] for s in students) == 2
+    assign = pl.LpVariable.dicts(
+        "assign",
+        [(s, t) for s in students for t in slots],
+        0,
+        1,
+        pl.LpBinary
+    )
 
-for s in students:
-    for t in slots:
-        value = preferences[(s, t)]
-        if "MUST-HAVE" in value:
-            model += assign[(s, t)] == 1
-        if "UNAVAILABLE" in value:
-            model += assign[(s, t)] == 0
-
-if config.SCHEDULE_MODE == "CONTIGUOUS":
-    consec_vars = []
     for s in students:
-        for i in range(len(slots) - 1):
-            t1, t2 = slots[i], slots[i + 1]
-            y = pl.LpVariable(f"consec_{s}_{i}", 0, 1, pl.LpBinary)
-            model += y <= assign[(s, t1)]
-            model += y <= assign[(s, t2)]
-            model += y >= assign[(s, t1)] + assign[(s, t2)] - 1
-            consec_vars.append(y)
-    model += -pl.lpSum(consec_vars)
-else:
-    model += 0
-
-solver = pl.PULP_CBC_CMD(msg=1, timeLimit=60)
-model.solve(solver)
-if pl.LpStatus[model.status] != 'Optimal':
-    print('NO OPTIMAL ASSIGNMENT')
-else:
-    student_info = {}
-    for _, row in df.iterrows():
-        email = str(row["Email"])
-        student_info[email] = (
-            row["ID"],
-            row["Last name"],
-            row["First name"],
-        )
+        if min_slots:
+            model += pl.lpSum(assign[(s, t)] for t in committed) >= min_slots
+        model += pl.lpSum(assign[(s, t)] for t in committed) <= config.MAX_SLOTS_PER_STUDENT
+        if ahead:
+            model += pl.lpSum(assign[(s, t)] for t in ahead) <= config.MAX_SLOTS_PER_STUDENT
 
-    rows_students = []
-    for s in students:
-        chosen = [t for t in slots if pl.value(assign[(s, t)]) > 0.5]
-        chosen = chosen[:3] + [""] * (3 - len(chosen))
-        sid, lname, fname = student_info.get(s, ("", "", ""))
-        rows_students.append([sid, s, lname, fname] + chosen)
-
-    pd.DataFrame(
-        rows_students,
-        columns=[
-            "student_id",
-            "student_email",
-            "student_last_name",
-            "student_first_name",
-            "slot 1",
-            "slot 2",
-            "slot 3",
-        ],
-    ).to_csv(output_path.replace(".csv", "_by_students.csv"), index=False)
-
-    rows_slots = []
     for t in slots:
-        assigned_students = [s for s in students if pl.value(assign[(s, t)]) > 0.5]
-        assigned_students = assigned_students[:2] + [""] * (2 - len(assigned_students))
-        rows_slots.append([t] + assigned_students)
-
-    pd.DataFrame(
-        rows_slots,
-        columns=["slot", "student 1", "student 2"],
-    ).to_csv(output_path.replace(".csv", "_by_slot.csv"), index=False)
+        model += pl.lpSum(assign[(s, t)] for s in students) == config.STUDENTS_PER_SLOT
+
+    for i, j in zip(*np.nonzero(must)):
+        model += assign[(students[i], slots[j])] == 1
+    for i, j in zip(*np.nonzero(unavailable)):
+        model += assign[(students[i], slots[j])] == 0
+
+    if config.SCHEDULE_MODE == "CONTIGUOUS":
+        consec_vars = []
+        for s in students:
+            for i in range(len(slots) - 1):
+                t1, t2 = slots[i], slots[i + 1]
+                y = pl.LpVariable(f"consec_{s}_{i}", 0, 1, pl.LpBinary)
+                model += y <= assign[(s, t1)]
+                model += y <= assign[(s, t2)]
+                model += y >= assign[(s, t1)] + assign[(s, t2)] - 1
+                consec_vars.append(y)
+        if carry is not None:
+            consec_vars += [assign[(students[i], slots[0])] for i in np.flatnonzero(carry)]
+        model += -pl.lpSum(consec_vars)
+    else:
+        model += 0
+
+    return model, assign
+
+
+def run_lagrangian(must, unavailable):
+    result = solve_lagrangian(must, unavailable, contiguous=config.SCHEDULE_MODE == "CONTIGUOUS")
+    print(
+        f"Lagrangian: contiguity {result.lower_bound:g} (bound {result.upper_bound:.2f}) "
+        f"after {result.iterations} iterations{', optimal' if result.optimal else ''}"
+    )
+    return result
+
+
+def run_bitset(must, unavailable):
+    result = solve_bitset(must, unavailable, contiguous=config.SCHEDULE_MODE == "CONTIGUOUS")
+    if result.infeasible:
+        print(f"Bitset search: infeasible after {result.nodes} nodes")
+    else:
+        print(
+            f"Bitset search: contiguity {result.score:g} after {result.nodes} nodes"
+            f"{', optimal' if result.optimal else ' (time limit)'}"
+        )
+    return result
+
+
+def solve_ilp(students, slots, must, unavailable, warm_start=False, log_path=None):
+    """Solve the PuLP model with CBC; returns (assignment matrix or None, proven optimal).
+
+    A run stopped by the 60 s time limit with an incumbent still returns its schedule (PuLP reports
+    it as Optimal), but with the flag False since CBC did not prove it optimal.
+
+    With warm_start in CONTIGUOUS mode the Lagrangian engine runs first: its schedule is passed to
+    CBC as the starting incumbent and its bound is added as a cut on the objective. log_path
+    sends the CBC log to a file instead of stdout.
+    """
+    model, assign = build_model(students, slots, must, unavailable)
+    has_start = False
+    if warm_start and config.SCHEDULE_MODE == "CONTIGUOUS":
+        result = run_lagrangian(must, unavailable)
+        if result.infeasible:
+            return None, False
+        if result.assignment is not None:
+            for i, s in enumerate(students):
+                for j, t in enumerate(slots):
+                    assign[(s, t)].setInitialValue(int(result.assignment[i, j]))
+            has_start = True
+        model += model.objective >= -math.floor(result.upper_bound + 1e-9)
+
+    solver = pl.PULP_CBC_CMD(msg=log_path is None, timeLimit=60, warmStart=has_start, logPath=log_path)
+    model.solve(solver)
+    if pl.LpStatus[model.status] != 'Optimal':
+        return None, False
+    return extract_assignment(assign, students, slots), model.sol_status == pl.LpSolutionOptimal
+
+
+def solve_rolling(students, slots, must, unavailable, window, overlap=0):
+    """Solve `window` slots at a time (e.g. one week) and stitch the windows together.
+
+    Each solve also sees the first `overlap` slots of the next window so it does not paint the
+    next window into a corner; those lookahead slots are then re-solved with the next window.
+    Finished windows are fixed, and the only state carried forward is who holds the last
+    committed slot. Each student gets 2-3 slots per window (a shorter final window only keeps the
+    cap), and every model has at most window + overlap slot columns, whatever the horizon.
+    """
+    matrix = np.zeros((len(students), len(slots)), dtype=bool)
+    carry = None
+    for start in range(0, len(slots), window):
+        stop = min(start + window, len(slots))
+        ahead = min(overlap, len(slots) - stop)
+        cols = slice(start, stop + ahead)
+        min_slots = config.MIN_SLOTS_PER_STUDENT if stop - start == window else 0
+        model, assign = build_model(
+            students, slots[cols], must[:, cols], unavailable[:, cols], ahead, carry, min_slots
+        )
+        model.solve(pl.PULP_CBC_CMD(msg=0, timeLimit=60))
+        if pl.LpStatus[model.status] != 'Optimal':
+            print(f"Slots {start + 1}-{stop}: no feasible assignment")
+            return None
+        matrix[:, start:stop] = extract_assignment(assign, students, slots[cols])[:, :stop - start]
+        carry = matrix[:, stop - 1]
+        print(f"Slots {start + 1}-{stop}: objective {pl.value(model.objective) or 0:g}")
+    return matrix
+
+
+def extract_assignment(assign, students, slots):
+    """Read the solved variables once into a dense students x slots boolean matrix."""
+    values = np.fromiter(
+        (assign[(s, t)].varValue or 0 for s in students for t in slots),
+        dtype=float,
+        count=len(students) * len(slots),
+    )
+    return values.reshape(len(students), len(slots)) > 0.5
+
+
+def student_info(df):
+    """Return (id, last name, first name) per response row, with blanks for missing cells."""
+    columns = [df[c].astype(object).where(df[c].notna(), "").tolist() for c in ("ID", "Last name", "First name")]
+    return list(zip(*columns))
+
+
+def student_columns(width):
+    """Per-student header with `width` slot columns."""
+    return STUDENT_COLUMNS[:4] + [f"slot {k}" for k in range(1, width + 1)]
+
+
+def student_width(rows):
+    """Slot columns needed in the per-student view: 3, or more for a rolling horizon.
+
+    rows is the student index of every assigned cell, e.g. np.nonzero(matrix)[0].
+    """
+    return max(3, int(np.bincount(rows).max(initial=0)))
+
+
+def schedule_rows(matrix, students, slots, info, width=3):
+    """Derive both schedule views from the assignment matrix.
+
+    The nonzero cells are read once: np.nonzero walks the matrix row-major, which groups the
+    cells by student, and a stable sort of the same cells on the slot index groups them by slot.
+    Returns two generators so writers can stream rows without materialising a DataFrame.
+    """
+    rows, cols = np.nonzero(matrix)
+    return cell_rows(rows, cols, students, slots, info, width)
+
+
+def cell_rows(rows, cols, students, slots, info, width=3):
+    """schedule_rows for the assigned cells, given grouped by student (row-major order)."""
+    student_bounds = np.searchsorted(rows, np.arange(len(students) + 1))
+    by_slot = np.argsort(cols, kind="stable")
+    slot_bounds = np.searchsorted(cols[by_slot], np.arange(len(slots) + 1))
+    slot_members = rows[by_slot]
+
+    def student_rows():
+        for i, s in enumerate(students):
+            chosen = [slots[j] for j in cols[student_bounds[i]:student_bounds[i + 1]]]
+            chosen = chosen[:width] + [""] * (width - len(chosen))
+            sid, lname, fname = info[i]
+            yield [sid, s, lname, fname] + chosen
+
+    def slot_rows():
+        for j, t in enumerate(slots):
+            assigned_students = [students[i] for i in slot_members[slot_bounds[j]:slot_bounds[j + 1]]]
+            assigned_students = assigned_students[:2] + [""] * (2 - len(assigned_students))
+            yield [t] + assigned_students
+
+    return student_rows(), slot_rows()
+
+
+def _write_csv(path, columns, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerow(columns)
+        for row in rows:
+            writer.writerow(row)
+
+
+def _write_json(path, columns, rows):
+    # one record per line inside a JSON array, so large schedules are never held as one string
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("[")
+        for n, row in enumerate(rows):
+            f.write(",\n" if n else "\n")
+            f.write(json.dumps(dict(zip(columns, row)), default=str))
+        f.write("\n]\n")
+
+
+def _write_parquet(path, columns, rows, batch_size=10000):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise SystemExit("Parquet output requires pyarrow: pip install pyarrow")
+    schema = pa.schema([(c, pa.string()) for c in columns])
+    with pq.ParquetWriter(path, schema) as writer:
+        batch = []
+        for row in rows:
+            batch.append({c: str(v) for c, v in zip(columns, row)})
+            if len(batch) == batch_size:
+                writer.write_table(pa.Table.from_pylist(batch, schema))
+                batch = []
+        if batch:
+            writer.write_table(pa.Table.from_pylist(batch, schema))
+
+
+WRITERS = {"csv": _write_csv, "json": _write_json, "parquet": _write_parquet}
+
+
+def write_schedule(output_path, matrix, students, slots, info, fmt=None):
+    """Write <base>_by_students.<fmt> and <base>_by_slot.<fmt> next to output_path.
+
+    The format defaults to the extension of output_path.
+    """
+    rows, cols = np.nonzero(matrix)
+    return write_cells(output_path, rows, cols, students, slots, info, fmt)
+
+
+def write_cells(output_path, rows, cols, students, slots, info, fmt=None):
+    """write_schedule for a schedule given as its assigned (student, slot) cells in row-major order."""
+    base, ext = os.path.splitext(output_path)
+    fmt = fmt or ext.lstrip(".").lower() or "csv"
+    if fmt not in WRITERS:
+        raise SystemExit(f"Unsupported output format: {fmt} (expected one of {', '.join(OUTPUT_FORMATS)})")
+    width = student_width(rows)
+    student_rows, slot_rows = cell_rows(rows, cols, students, slots, info, width)
+    paths = (f"{base}_by_students.{fmt}", f"{base}_by_slot.{fmt}")
+    WRITERS[fmt](paths[0], student_columns(width), student_rows)
+    WRITERS[fmt](paths[1], SLOT_COLUMNS, slot_rows)
+    return paths
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Build the LabOp schedule from survey responses")
+    p.add_argument("responses", help="responses CSV")
+    p.add_argument("schedule", help="output base path, e.g. schedule.csv")
+    p.add_argument("--format", choices=OUTPUT_FORMATS, default=None, help="output format (default: schedule extension)")
+    p.add_argument("--backend", choices=BACKENDS, default="ilp", help="solver: PuLP/CBC model, Lagrangian decomposition, or bitset search")
+    p.add_argument("--warm-start", action="store_true", help="ilp backend: seed CBC with the Lagrangian schedule and bound")
+    p.add_argument("--window", type=int, default=None, help="rolling horizon: slots per window, e.g. one week")
+    p.add_argument("--overlap", type=int, default=0, help="rolling horizon: lookahead slots into the next window")
+    p.add_argument("--check", action="store_true", help="run the check_output.py checks on the in-memory schedule")
+    p.add_argument("--large", action="store_true", help="memory-bounded mode for very large response files (ilp backend)")
+    p.add_argument("--max-memory", type=int, default=None, help="memory ceiling in MB; implies --large")
+    return p.parse_args()
+
+
+def run_large(args, input_path, output_path):
+    """The memory-bounded path from large.py. It always uses CBC and writes no substitute index."""
+    import large  # resource is POSIX-only; the normal path must still run without it
+    if args.window or args.warm_start or args.backend != "ilp":
+        raise SystemExit("--large supports the ilp backend only, without --window or --warm-start")
+    if args.max_memory:
+        large.set_memory_limit(args.max_memory)
+    solver_peak = large.CBC_NOT_STARTED
+    try:
+        resp = large.read_responses(input_path)
+        print(f"Read {len(resp.students)} students x {len(resp.slots)} slots, {len(resp.indices)} allowed cells")
+        chosen, solver_peak = large.solve_large(resp, config.SCHEDULE_MODE == "CONTIGUOUS")
+        if chosen is None:
+            print('NO OPTIMAL ASSIGNMENT')
+            return
+        write_cells(output_path, resp.rows[chosen], resp.indices[chosen], resp.students, resp.slots,
+                    resp.info, args.format)
+        if args.check:
+            problems = large.check_chosen(resp, chosen)
+            print("\n".join(problems) if problems else "All schedule checks passed.")
+    except MemoryError as e:
+        solver_peak = getattr(e, "peak", solver_peak)
+        if not args.max_memory:
+            raise
+        raise SystemExit(f"Memory ceiling of {args.max_memory} MB reached{f' ({e})' if str(e) else ''}")
+    finally:
+        if solver_peak == large.CBC_NOT_STARTED:
+            solver = "not started"
+        elif solver_peak is None:
+            solver = "unavailable on this platform"
+        else:
+            solver = f"{solver_peak:.0f} MB" if solver_peak else "not sampled, finished too quickly"
+        print(f"Peak RSS: {large.peak_rss():.0f} MB (scheduler), CBC {solver}")
+
+
+def main():
+    args = parse_args()
+    input_path = os.path.join(os.getcwd(), args.responses)
+    output_path = os.path.join(os.getcwd(), args.schedule)
+    if args.large or args.max_memory:
+        run_large(args, input_path, output_path)
+        return
+    if args.window is not None and args.window < 1:
+        raise SystemExit("--window must be at least 1 slot")
+    if args.overlap < 0:
+        raise SystemExit("--overlap cannot be negative")
+    if args.window and (args.backend != "ilp" or args.warm_start):
+        raise SystemExit("--window supports the ilp backend only, without --warm-start")
+
+    df = pd.read_csv(input_path)
+
+    students = df.iloc[:, 3].astype(str).tolist()
+    slots = df.columns[8:].tolist()
+
+    must, unavailable = preference_masks(df, slots)
+    if args.window:
+        matrix = solve_rolling(students, slots, must, unavailable, args.window, args.overlap)
+    elif args.backend == "lagrangian":
+        matrix = run_lagrangian(must, unavailable).assignment
+    elif args.backend == "bitset":
+        matrix = run_bitset(must, unavailable).assignment
+    else:
+        matrix, _ = solve_ilp(students, slots, must, unavailable, args.warm_start)
+    if matrix is None:
+        print('NO OPTIMAL ASSIGNMENT')
+        return
+
+    info = student_info(df)
+    write_schedule(output_path, matrix, students, slots, info, args.format)
+    SubstituteIndex(students, slots, matrix, unavailable, must, info, args.window).save(
+        os.path.splitext(output_path)[0] + "_substitutes.json"
+    )
+
+    if args.check:
+        check_output.report(*check_output.check_matrix(df, matrix))
+
+
+if __name__ == "__main__":
+    main()
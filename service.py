@@ -0,0 +1,429 @@
+## python service.py [--host 127.0.0.1] [--port 8765 | --unix /tmp/labop.sock] [--workers 2]
+"""Local scheduling service around the schedule.py pipeline.
+
+Endpoints (request bodies are the raw CSV text unless noted):
+
+    GET  /health                 worker count and jobs in flight
+    POST /check                  check_responses.py on a responses CSV
+    POST /verify                 check_output.py; JSON body {"responses", "by_students", "by_slot"} of CSV texts
+    POST /schedule?backend=ilp|lagrangian|bitset&mode=CONTIGUOUS|SPREAD&warm_start=0|1
+                                 solve a responses CSV; the reply is a stream of JSON lines
+
+Solves run on a bounded process pool whose workers import pandas/PuLP once and stay warm.
+Identical concurrent /schedule requests (same body and options) share one job: later callers
+get the events already sent, then follow the job live. Each job reports "queued", "started",
+"incumbent"/"progress" events while it runs, and ends with a "done" event carrying the status
+("Optimal", or "Feasible" when a limit stopped the solver first) and, when solved, both schedule views.
+"""
+import argparse
+import asyncio
+import hashlib
+import io
+import json
+import math
+import multiprocessing
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+
+import check_output
+import check_responses
+import config
+import schedule
+from lagrangian import solve_lagrangian
+from bitset import solve_bitset
+
+MODES = ("CONTIGUOUS", "SPREAD")
+MAX_BODY = 32 * 1024 * 1024
+
+CBC_INCUMBENT = re.compile(r"Integer solution of (\S+) found")
+CBC_PROGRESS = re.compile(r"After (\d+) nodes, \d+ on tree, (\S+) best solution, best possible (\S+)")
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+
+def _finite(value):
+    return value if value is not None and math.isfinite(value) else None
+
+
+def _warm_worker():
+    # touching the heavy modules here means the first job on a spawned worker does not pay for them
+    import pulp  # noqa: F401
+    pd.DataFrame({"x": [0]}).to_csv(io.StringIO())
+
+
+def _tail_cbc(log_path, stop, post):
+    """Follow the CBC log file and post incumbents and bounds as they appear.
+
+    A read can end in the middle of a line CBC is still writing; that tail is held back until its
+    newline arrives (or CBC has finished), so a line is never matched in two halves.
+    """
+    position = 0
+    partial = ""
+    while True:
+        finished = stop.wait(0.2)
+        if os.path.exists(log_path):
+            with open(log_path) as f:
+                f.seek(position)
+                chunk = f.read()
+                position = f.tell()
+            lines = (partial + chunk).split("\n")
+            partial = lines.pop()
+            if finished and partial:
+                lines.append(partial)
+            for line in lines:
+                m = CBC_INCUMBENT.search(line)
+                if m:
+                    post(event="incumbent", objective=float(m.group(1)))
+                m = CBC_PROGRESS.search(line)
+                if m:
+                    post(event="progress", nodes=int(m.group(1)), objective=float(m.group(2)),
+                         bound=float(m.group(3)))
+        if finished:
+            return
+
+
+def run_job(job_id, payload, backend, mode, warm_start, events):
+    """Solve one responses CSV inside a pool worker; events go back through `events`."""
+    def post(**event):
+        events.put((job_id, event))
+
+    try:
+        return _solve(payload, backend, mode, warm_start, post)
+    finally:
+        # tells the service that every event of this job has been queued
+        events.put((job_id, None))
+
+
+def _solve(payload, backend, mode, warm_start, post):
+    config.SCHEDULE_MODE = mode
+    post(event="started", pid=os.getpid())
+    df = pd.read_csv(io.StringIO(payload))
+    students = df.iloc[:, 3].astype(str).tolist()
+    slots = df.columns[8:].tolist()
+    must, unavailable = schedule.preference_masks(df, slots)
+
+    if backend == "lagrangian":
+        result = solve_lagrangian(
+            must, unavailable, contiguous=mode == "CONTIGUOUS",
+            progress=lambda it, lower, upper: post(event="progress", iteration=it,
+                                                   objective=_finite(lower), bound=_finite(upper)),
+        )
+        matrix, optimal = result.assignment, result.optimal
+    elif backend == "bitset":
+        result = solve_bitset(
+            must, unavailable, contiguous=mode == "CONTIGUOUS",
+            progress=lambda nodes, score: post(event="incumbent", objective=score, nodes=nodes),
+        )
+        matrix, optimal = result.assignment, result.optimal
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            log_path = os.path.join(tmp, "cbc.log")
+            stop = threading.Event()
+            tail = threading.Thread(target=_tail_cbc, args=(log_path, stop, post), daemon=True)
+            tail.start()
+            try:
+                matrix, optimal = schedule.solve_ilp(students, slots, must, unavailable, warm_start, log_path)
+            finally:
+                stop.set()
+                tail.join()
+
+    if matrix is None:
+        return {"status": "NO OPTIMAL ASSIGNMENT"}
+    width = schedule.student_width(np.nonzero(matrix)[0])
+    student_rows, slot_rows = schedule.schedule_rows(matrix, students, slots, schedule.student_info(df), width)
+    columns = schedule.student_columns(width)
+    return {
+        # a schedule the solver could not prove optimal (iteration or time limit) is "Feasible"
+        "status": "Optimal" if optimal else "Feasible",
+        "by_students": [dict(zip(columns, row)) for row in student_rows],
+        "by_slot": [dict(zip(schedule.SLOT_COLUMNS, row)) for row in slot_rows],
+    }
+
+
+class Job:
+    def __init__(self, key):
+        self.id = uuid.uuid4().hex[:12]
+        self.key = key
+        self.history = []
+        self.listeners = set()
+        self.done = False
+        self.drained = False
+        self.future = None
+
+    def publish(self, event):
+        self.history.append(event)
+        if event["event"] == "done":
+            self.done = True
+        for queue in self.listeners:
+            queue.put_nowait(event)
+
+
+class Busy(Exception):
+    pass
+
+
+class SchedulerService:
+    def __init__(self, workers=2, max_jobs=None):
+        self.workers = workers
+        self.max_jobs = max_jobs or 4 * workers
+        self.pool = self._new_pool()
+        self.manager = multiprocessing.Manager()
+        self.events = self.manager.Queue()
+        self.inflight = {}
+        self.jobs = {}
+        self.loop = None
+        self.pump = None
+
+    def _new_pool(self):
+        return ProcessPoolExecutor(max_workers=self.workers, initializer=_warm_worker)
+
+    def _restart_pool(self, broken):
+        """Replace the pool after a worker died (OOM kill, crash); later jobs get fresh workers."""
+        if self.pool is broken:
+            print("worker pool broken, starting a new one")
+            broken.shutdown(wait=False, cancel_futures=True)
+            self.pool = self._new_pool()
+
+    def _run(self, *args):
+        pool = self.pool
+        try:
+            return pool, self.loop.run_in_executor(pool, run_job, *args, self.events)
+        except BrokenProcessPool:
+            self._restart_pool(pool)
+            return self.pool, self.loop.run_in_executor(self.pool, run_job, *args, self.events)
+
+    def start(self):
+        self.loop = asyncio.get_running_loop()
+        self.pump = threading.Thread(target=self._pump, daemon=True)
+        self.pump.start()
+
+    def close(self):
+        self.events.put(None)
+        self.pool.shutdown(cancel_futures=True)
+        self.manager.shutdown()
+
+    def _pump(self):
+        # the manager queue blocks, so it is drained on a thread and handed to the event loop
+        while True:
+            item = self.events.get()
+            if item is None:
+                return
+            job_id, event = item
+            self.loop.call_soon_threadsafe(self._dispatch, job_id, event)
+
+    def _dispatch(self, job_id, event):
+        job = self.jobs.get(job_id)
+        if job is None or job.done:
+            return
+        if event is None:
+            job.drained = True
+            if job.future is not None and job.future.done():
+                self._complete(job)
+        else:
+            job.publish(event)
+
+    def submit(self, payload, backend, mode, warm_start):
+        """Return the job for this request, joining an identical one that is still running."""
+        key = hashlib.sha256(f"{backend}|{mode}|{int(warm_start)}|".encode() + payload.encode()).hexdigest()
+        job = self.inflight.get(key)
+        if job is not None:
+            return job, True
+        if len(self.inflight) >= self.max_jobs:
+            raise Busy()
+        job = Job(key)
+        self.inflight[key] = job
+        self.jobs[job.id] = job
+        job.publish({"event": "queued", "job": job.id, "time": time.time()})
+        try:
+            pool, future = self._run(job.id, payload, backend, mode, warm_start)
+        except BaseException:
+            # nothing will ever finish this job, so it must not be joined or counted
+            del self.inflight[key]
+            del self.jobs[job.id]
+            raise
+        job.future = future
+        future.add_done_callback(lambda f: self._finish(job, pool))
+        return job, False
+
+    def _finish(self, job, pool):
+        del self.inflight[job.key]
+        if not job.future.cancelled() and isinstance(job.future.exception(), BrokenProcessPool):
+            self._restart_pool(pool)
+        # a worker that died never sends its end marker, so only wait for it after a clean return
+        if job.drained or job.future.cancelled() or job.future.exception() is not None:
+            self._complete(job)
+
+    def _complete(self, job):
+        # the end marker can be dispatched after the future is done but before _finish runs, and
+        # then both call this; only the first publishes "done"
+        if job.done:
+            return
+        future = job.future
+        if future.cancelled():
+            result = {"status": "cancelled"}
+        elif future.exception() is not None:
+            result = {"status": "error", "error": repr(future.exception())}
+        else:
+            result = future.result()
+        job.publish({"event": "done", "job": job.id, **result})
+        self.jobs.pop(job.id, None)
+
+    async def follow(self, job):
+        """Yield a job's events from the beginning, then live until it is done."""
+        queue = asyncio.Queue()
+        for event in list(job.history):
+            queue.put_nowait(event)
+        job.listeners.add(queue)
+        try:
+            while True:
+                event = await queue.get()
+                yield event
+                if event["event"] == "done":
+                    return
+        finally:
+            job.listeners.discard(queue)
+
+
+async def _read_request(reader):
+    line = await reader.readline()
+    if not line:
+        return None
+    method, target, _ = line.decode("latin-1").split(" ", 2)
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get("content-length", 0))
+    if length > MAX_BODY:
+        raise ValueError("request body too large")
+    body = await reader.readexactly(length) if length else b""
+    return method, urlsplit(target), body
+
+
+async def _send_json(writer, status, payload):
+    body = json.dumps(payload, default=_json_default).encode()
+    writer.write(
+        f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+        f"Connection: close\r\n\r\n".encode() + body
+    )
+    await writer.drain()
+
+
+async def _stream(writer, events):
+    writer.write(
+        b"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\nTransfer-Encoding: chunked\r\n"
+        b"Connection: close\r\n\r\n"
+    )
+    async for event in events:
+        data = json.dumps(event, default=_json_default).encode() + b"\n"
+        writer.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        await writer.drain()
+    writer.write(b"0\r\n\r\n")
+    await writer.drain()
+
+
+def _check(payload):
+    total_must, student_violations, slot_violations = check_responses.check(pd.read_csv(io.StringIO(payload)))
+    return {"total_must": total_must, "student_violations": student_violations, "slot_violations": slot_violations}
+
+
+def _verify(payload):
+    data = json.loads(payload)
+    frames = [pd.read_csv(io.StringIO(data[k])) for k in ("responses", "by_students", "by_slot")]
+    names = ("non_unique_student_slots", "must_have_violations", "unavailable_violations", "non_unique_slot_students")
+    return dict(zip(names, check_output.check_files(*frames)))
+
+
+async def handle(service, reader, writer):
+    try:
+        request = await _read_request(reader)
+        if request is None:
+            return
+        method, url, body = request
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        loop = asyncio.get_running_loop()
+
+        if method == "GET" and url.path == "/health":
+            await _send_json(writer, "200 OK", {"status": "ok", "workers": service.workers,
+                                                "inflight": len(service.inflight)})
+        elif method == "POST" and url.path == "/check":
+            await _send_json(writer, "200 OK", await loop.run_in_executor(None, _check, body.decode()))
+        elif method == "POST" and url.path == "/verify":
+            await _send_json(writer, "200 OK", await loop.run_in_executor(None, _verify, body.decode()))
+        elif method == "POST" and url.path == "/schedule":
+            backend = query.get("backend", "ilp")
+            mode = query.get("mode", config.SCHEDULE_MODE).upper()
+            if backend not in schedule.BACKENDS or mode not in MODES:
+                await _send_json(writer, "400 Bad Request", {"error": "unknown backend or mode"})
+                return
+            try:
+                job, joined = service.submit(body.decode(), backend, mode, query.get("warm_start") == "1")
+            except Busy:
+                await _send_json(writer, "503 Service Unavailable", {"error": "job queue is full"})
+                return
+            except (BrokenProcessPool, RuntimeError) as e:
+                await _send_json(writer, "503 Service Unavailable", {"error": f"could not start job: {e!r}"})
+                return
+            if joined:
+                print(f"request joined in-flight job {job.id}")
+            await _stream(writer, service.follow(job))
+        else:
+            await _send_json(writer, "404 Not Found", {"error": f"no route for {method} {url.path}"})
+    except (ValueError, KeyError, pd.errors.ParserError) as e:
+        await _send_json(writer, "400 Bad Request", {"error": str(e)})
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(args):
+    service = SchedulerService(args.workers, args.max_jobs)
+    service.start()
+    handler = lambda r, w: handle(service, r, w)
+    if args.unix:
+        server = await asyncio.start_unix_server(handler, path=args.unix)
+        where = args.unix
+    else:
+        server = await asyncio.start_server(handler, args.host, args.port)
+        where = f"http://{args.host}:{args.port}"
+    print(f"Scheduling service listening on {where} with {args.workers} workers")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Local scheduling service with a warm worker pool")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8765)
+    p.add_argument("--unix", default=None, help="listen on this Unix socket instead of TCP")
+    p.add_argument("--workers", type=int, default=2, help="solver processes")
+    p.add_argument("--max-jobs", type=int, default=None, help="distinct jobs in flight before rejecting (default 4 x workers)")
+    return p.parse_args()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(serve(parse_args()))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,234 @@
+## python substitutes.py schedule_substitutes.json list SLOT
+## python substitutes.py schedule_substitutes.json query SLOT STUDENT_EMAIL
+## python substitutes.py schedule_substitutes.json apply SLOT STUDENT_EMAIL [--schedule schedule.csv]
+import argparse
+import bisect
+import json
+import time
+import numpy as np
+from config import MAX_SLOTS_PER_STUDENT
+
+
+class SubstituteIndex:
+    """Ranked replacement candidates for every slot of a solved schedule.
+
+    A student is a candidate for a slot if they are not UNAVAILABLE for it, hold fewer than
+    MAX_SLOTS_PER_STUDENT slots, and are not already in it. Candidates are ranked by how many of
+    their own assigned slots touch the slot (so a replacement extends a block rather than opening
+    a new one), then by current load, then by response order.
+
+    With a rolling-horizon schedule the cap applies per `window` slots instead of to the whole row.
+
+    Each slot keeps its candidates as a sorted list of (key, student) tuples. A candidate's key only
+    depends on that student's own row, so applying a change re-ranks just the students it touches.
+    """
+
+    def __init__(self, students, slots, assignment, unavailable, must=None, info=None, window=None):
+        self.students = list(students)
+        self.slots = list(slots)
+        self.assignment = np.array(assignment, dtype=bool)
+        self.unavailable = np.array(unavailable, dtype=bool)
+        self.must = np.zeros_like(self.assignment) if must is None else np.array(must, dtype=bool)
+        self.info = info
+        self.window = window or max(len(self.slots), 1)
+        self.student_pos = {s: i for i, s in enumerate(self.students)}
+        self.slot_pos = {t: j for j, t in enumerate(self.slots)}
+        self._build()
+
+    def _build(self):
+        a = self.assignment
+        adjacent = np.zeros(a.shape, dtype=int)
+        adjacent[:, 1:] += a[:, :-1]
+        adjacent[:, :-1] += a[:, 1:]
+        block_load = np.add.reduceat(a, np.arange(0, a.shape[1], self.window), axis=1) if a.size else a
+        load = np.repeat(block_load, self.window, axis=1)[:, :a.shape[1]]
+        eligible = ~self.unavailable & ~a & (load < MAX_SLOTS_PER_STUDENT)
+        self.ranked = []
+        for j in range(len(self.slots)):
+            cand = np.flatnonzero(eligible[:, j])
+            order = np.lexsort((cand, load[cand, j], -adjacent[cand, j]))
+            self.ranked.append([((-int(adjacent[i, j]), int(load[i, j])), int(i)) for i in cand[order]])
+
+    def _block(self, j):
+        start = j - j % self.window
+        return slice(start, start + self.window)
+
+    def _adjacent(self, i, j):
+        row = self.assignment[i]
+        return int(j > 0 and row[j - 1]) + int(j + 1 < len(row) and row[j + 1])
+
+    def _key(self, i, j):
+        """Ranking key of student i for slot j, or None if they are not a candidate."""
+        row = self.assignment[i]
+        load = int(row[self._block(j)].sum())
+        if self.unavailable[i, j] or row[j] or load >= MAX_SLOTS_PER_STUDENT:
+            return None
+        return (-self._adjacent(i, j), load)
+
+    def _detach(self, i):
+        for j in range(len(self.slots)):
+            key = self._key(i, j)
+            if key is not None:
+                ranked = self.ranked[j]
+                del ranked[bisect.bisect_left(ranked, (key, i))]
+
+    def _attach(self, i):
+        for j in range(len(self.slots)):
+            key = self._key(i, j)
+            if key is not None:
+                bisect.insort(self.ranked[j], (key, i))
+
+    def candidates(self, slot):
+        return [self.students[i] for _, i in self.ranked[self.slot_pos[slot]]]
+
+    def query(self, slot, student):
+        """Find cover for `student` dropping `slot`.
+
+        Returns a list of moves (student, from_slot, to_slot) or None if no cover exists. A direct
+        replacement is one move. Otherwise a two-step swap chain is tried: a student already at the
+        cap moves into the slot, releasing another of their non-MUST-HAVE slots in the same window,
+        which is filled by a candidate for that slot. The dropping student is never used as cover.
+        """
+        i, j = self.student_pos[student], self.slot_pos[slot]
+        if not self.assignment[i, j]:
+            raise ValueError(f"{student} is not assigned to {slot}")
+        for _, b in self.ranked[j]:
+            if b != i:
+                return [(self.students[b], None, slot)]
+
+        best, best_key = None, None
+        block = self._block(j)
+        for b in np.flatnonzero(~self.unavailable[:, j] & ~self.assignment[:, j]):
+            if b == i:
+                continue
+            for k in np.flatnonzero(self.assignment[b, block] & ~self.must[b, block]) + block.start:
+                c = next((c for _, c in self.ranked[k] if c not in (i, b)), None)
+                if c is None:
+                    continue
+                self.assignment[b, k] = False
+                gain = self._adjacent(b, j) + self._adjacent(c, k)
+                self.assignment[b, k] = True
+                key = (-gain, int(self.assignment[c, self._block(k)].sum()))
+                if best_key is None or key < best_key:
+                    best_key = key
+                    best = [(self.students[b], self.slots[k], slot), (self.students[c], None, self.slots[k])]
+        return best
+
+    def apply(self, slot, student):
+        """Apply the best cover for `student` dropping `slot` and update the index.
+
+        The dropping student is marked UNAVAILABLE for the slot so they are not offered it again.
+        Returns the applied moves, or None (and changes nothing) if no cover exists.
+        """
+        moves = self.query(slot, student)
+        if moves is None:
+            return None
+        touched = {self.student_pos[student]} | {self.student_pos[s] for s, _, _ in moves}
+        for i in touched:
+            self._detach(i)
+        i, j = self.student_pos[student], self.slot_pos[slot]
+        self.assignment[i, j] = False
+        self.unavailable[i, j] = True
+        for s, src, dst in moves:
+            b = self.student_pos[s]
+            if src is not None:
+                self.assignment[b, self.slot_pos[src]] = False
+            self.assignment[b, self.slot_pos[dst]] = True
+        for i in touched:
+            self._attach(i)
+        return moves
+
+    def to_dict(self):
+        def cells(mask):
+            return [np.flatnonzero(row).tolist() for row in mask]
+
+        return {
+            "students": self.students,
+            "slots": self.slots,
+            "info": self.info,
+            "window": self.window,
+            "assignment": cells(self.assignment),
+            "unavailable": cells(self.unavailable),
+            "must": cells(self.must),
+            "index": {t: self.candidates(t) for t in self.slots},
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        shape = (len(data["students"]), len(data["slots"]))
+
+        def mask(cells):
+            m = np.zeros(shape, dtype=bool)
+            for i, row in enumerate(cells):
+                m[i, row] = True
+            return m
+
+        return cls(data["students"], data["slots"], mask(data["assignment"]),
+                   mask(data["unavailable"]), mask(data["must"]), data.get("info"), data.get("window"))
+
+    def save(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, default=str)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+
+def describe(moves, slot, student):
+    if moves is None:
+        return f"No valid cover for {student} in {slot}"
+    if len(moves) == 1:
+        return f"Replace {student} in {slot} with {moves[0][0]}"
+    (b, src, _), (c, _, _) = moves
+    return f"Move {b} from {src} to {slot} (replacing {student}), then fill {src} with {c}"
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Query or update the substitute index written by schedule.py")
+    p.add_argument("index", help="substitute index JSON, e.g. schedule_substitutes.json")
+    p.add_argument("action", choices=["list", "query", "apply"])
+    p.add_argument("slot")
+    p.add_argument("student", nargs="?", help="email of the student dropping the slot (query/apply)")
+    p.add_argument("--schedule", default=None, help="after apply, rewrite the schedule views at this path")
+    args = p.parse_args()
+    if args.action != "list" and args.student is None:
+        p.error("query/apply need STUDENT_EMAIL")
+    return args
+
+
+def main():
+    args = parse_args()
+    index = SubstituteIndex.load(args.index)
+    if args.slot not in index.slot_pos:
+        raise SystemExit(f"Unknown slot: {args.slot}")
+    if args.action == "list":
+        for rank, s in enumerate(index.candidates(args.slot), 1):
+            print(rank, s)
+        return
+    if args.student not in index.student_pos:
+        raise SystemExit(f"Unknown student: {args.student}")
+
+    start = time.perf_counter()
+    try:
+        if args.action == "query":
+            moves = index.query(args.slot, args.student)
+        else:
+            moves = index.apply(args.slot, args.student)
+    except ValueError as e:
+        raise SystemExit(str(e))
+    elapsed = (time.perf_counter() - start) * 1000
+    print(describe(moves, args.slot, args.student))
+    print(f"({elapsed:.2f} ms)")
+
+    if args.action == "apply" and moves is not None:
+        index.save(args.index)
+        if args.schedule:
+            from schedule import write_schedule
+            info = index.info or [("", "", "")] * len(index.students)
+            write_schedule(args.schedule, index.assignment, index.students, index.slots, info)
+
+
+if __name__ == "__main__":
+    main()